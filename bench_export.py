@@ -0,0 +1,90 @@
+"""
+Compara tamanho em disco e tempo de carga: cids.xlsx x Parquet x Arrow IPC.
+
+Uso:
+    python bench_export.py                 # usa o cids.xlsx atual
+    python bench_export.py --sintetico 12000   # gera um xlsx sintético num diretório temporário
+"""
+import argparse, os, random, tempfile, time
+
+import storage
+import export_parquet
+
+REPETICOES = 3   # cargas medidas por formato (vale a melhor)
+
+def make_synthetic_xlsx(n_cids):
+    """Gera um cids.xlsx com ~n_cids linhas no formato do scraper (≈6 CIDs por categoria)."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(storage.EXCEL_SHEET)
+    ws.append(storage.HEADER)
+    rnd = random.Random(0)
+    n = 0
+    cat = 0
+    while n < n_cids:
+        letra = chr(ord("A") + (cat // 100) % 26)
+        cat_cod = f"{letra}{cat % 100:02d}"
+        cat_desc = f"Categoria {cat_cod} " + " ".join(rnd.choice(["doença", "infecção", "transtorno", "neoplasia", "lesão"]) for _ in range(4))
+        for k in range(rnd.randint(1, 10)):
+            ws.append([cat_cod, cat_desc, f"{cat_cod}.{k}", f"{cat_desc} - subtipo {k}"])
+            n += 1
+        cat += 1
+    wb.save(storage.EXCEL_PATH)
+
+def timed(fn, repeticoes=1):
+    """Executa fn `repeticoes` vezes; devolve o resultado e o menor tempo."""
+    melhor = None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        out = fn()
+        t = time.perf_counter() - t0
+        melhor = t if melhor is None else min(melhor, t)
+    return out, melhor
+
+def load_xlsx():
+    # passada read-only pura, a mesma que os exportadores fazem
+    return sum(1 for _ in storage.iter_rows_xlsx())
+
+def load_parquet():
+    import pyarrow.parquet as pq
+    return pq.read_table(export_parquet.PARQUET_PATH).num_rows
+
+def load_arrow():
+    import pyarrow as pa
+    with pa.memory_map(export_parquet.ARROW_PATH, "r") as src:
+        return pa.ipc.open_file(src).read_all().num_rows
+
+def run():
+    resultados = []
+    n, t = timed(load_xlsx, REPETICOES)
+    resultados.append(("xlsx", storage.EXCEL_PATH, n, t))
+
+    _, t_exp = timed(export_parquet.export_parquet)
+    n, t = timed(load_parquet, REPETICOES)
+    resultados.append(("parquet", export_parquet.PARQUET_PATH, n, t))
+    print(f"export parquet: {t_exp:.2f}s")
+
+    _, t_exp = timed(export_parquet.export_arrow)
+    n, t = timed(load_arrow, REPETICOES)
+    resultados.append(("arrow", export_parquet.ARROW_PATH, n, t))
+    print(f"export arrow:   {t_exp:.2f}s")
+
+    base_size = os.path.getsize(storage.EXCEL_PATH)
+    base_t = resultados[0][3]
+    print(f"\n{'formato':<8} {'linhas':>8} {'KiB':>10} {'x tam.':>7} {'carga (s)':>10} {'x vel.':>8}")
+    for nome, path, n, t in resultados:
+        size = os.path.getsize(path)
+        print(f"{nome:<8} {n:>8} {size / 1024:>10.1f} {size / base_size:>7.2f} {t:>10.4f} {base_t / t:>8.1f}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark xlsx x Parquet x Arrow IPC.")
+    ap.add_argument("--sintetico", type=int, metavar="N", help="gera N linhas sintéticas num diretório temporário")
+    args = ap.parse_args()
+
+    if args.sintetico:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            make_synthetic_xlsx(args.sintetico)
+            run()
+    else:
+        run()
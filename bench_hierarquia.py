@@ -0,0 +1,55 @@
+"""
+Benchmark do índice de hierarquia CID-10: lookup um a um (bisect) x lote (numpy searchsorted).
+
+Uso:
+    python bench_hierarquia.py [--datasus DIRETORIO] [--n 1000000]
+
+Sem --datasus, usa os capítulos embutidos e blocos sintéticos de 5 categorias.
+"""
+import argparse, random, time
+
+import hierarquia
+
+def synthetic_blocks():
+    blocos = []
+    for _, inicio, fim, _ in hierarquia.CAPITULOS:
+        k, kfim = hierarquia.category_key(inicio), hierarquia.category_key(fim)
+        while k <= kfim:
+            a = k
+            b = min(k + 4, kfim)
+            blocos.append((None, f"{chr(65 + a // 100)}{a % 100:02d}", f"{chr(65 + b // 100)}{b % 100:02d}", f"Bloco {a}"))
+            k = b + 1
+    return blocos
+
+def random_codes(n, seed=0):
+    rnd = random.Random(seed)
+    letras = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return [f"{rnd.choice(letras)}{rnd.randrange(100):02d}.{rnd.randrange(10)}" for _ in range(n)]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark do índice de hierarquia CID-10.")
+    ap.add_argument("--datasus", help="diretório com CID-10-GRUPOS (senão, blocos sintéticos)")
+    ap.add_argument("--n", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    if args.datasus:
+        idx = hierarquia.HierarchyIndex.from_datasus(args.datasus)
+    else:
+        idx = hierarquia.HierarchyIndex(hierarquia.CAPITULOS, synthetic_blocks())
+    print(f"{len(idx.capitulos.inicios)} capítulos, {len(idx.blocos.inicios)} blocos")
+    codigos = random_codes(args.n)
+
+    t0 = time.perf_counter()
+    for c in codigos:
+        idx.lookup(c)
+    dt = time.perf_counter() - t0
+    print(f"lookup um a um: {args.n} códigos em {dt:.2f}s ({dt / args.n * 1e6:.2f} µs/código)")
+
+    t0 = time.perf_counter()
+    caps, blocos = idx.lookup_batch(codigos)
+    dt = time.perf_counter() - t0
+    print(f"lookup em lote: {args.n} códigos em {dt:.2f}s ({dt / args.n * 1e6:.3f} µs/código)")
+
+    amostra = random.Random(1).sample(range(args.n), 1000)
+    assert all(idx.lookup(codigos[i])["bloco"] == (idx.blocos.rotulos[blocos[i]] if blocos[i] >= 0 else "")
+               for i in amostra), "lote e lookup unitário divergem"
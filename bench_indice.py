@@ -0,0 +1,56 @@
+"""
+Micro-benchmark do índice de CIDs (lookup, prefixo e busca textual).
+
+Uso:
+    python bench_indice.py                     # usa o cids.xlsx atual
+    python bench_indice.py --sintetico 12000   # gera um xlsx sintético num diretório temporário
+"""
+import argparse, os, random, tempfile, time
+
+import bench_export
+import indice
+import storage
+
+def bench(nome, fn, args, repeticoes):
+    t0 = time.perf_counter()
+    for i in range(repeticoes):
+        fn(args[i % len(args)])
+    dt = time.perf_counter() - t0
+    print(f"{nome:<12} {repeticoes:>7} consultas  {dt / repeticoes * 1e6:>8.1f} µs/consulta")
+
+def run(repeticoes):
+    t0 = time.perf_counter()
+    n = indice.build_index()
+    print(f"build: {n} entradas em {time.perf_counter() - t0:.2f}s, "
+          f"{os.path.getsize(indice.INDEX_PATH) / 1024:.1f} KiB")
+
+    rows = list(storage.iter_rows_xlsx())
+    rnd = random.Random(0)
+    codigos = [r[2] or r[0] for r in rnd.sample(rows, min(1000, len(rows)))]
+    prefixos = sorted({c[:3] for c in codigos})
+    palavras = [w for r in rnd.sample(rows, min(200, len(rows))) for w in indice.tokenize(r[3])[:2] if len(w) > 3]
+
+    t0 = time.perf_counter()
+    idx = indice.CidIndex()
+    idx.lookup(codigos[0])
+    print(f"primeira consulta (abre o mmap): {(time.perf_counter() - t0) * 1e6:.1f} µs")
+
+    bench("lookup", idx.lookup, codigos, repeticoes)
+    bench("prefixo", idx.prefix, prefixos, repeticoes)
+    if palavras:
+        bench("busca", idx.search, palavras, repeticoes // 10)
+    idx.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Micro-benchmark do índice de CIDs.")
+    ap.add_argument("--sintetico", type=int, metavar="N", help="gera N linhas sintéticas num diretório temporário")
+    ap.add_argument("--repeticoes", type=int, default=100000)
+    args = ap.parse_args()
+
+    if args.sintetico:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            bench_export.make_synthetic_xlsx(args.sintetico)
+            run(args.repeticoes)
+    else:
+        run(args.repeticoes)
@@ -0,0 +1,169 @@
+import os, json, time, hashlib, sqlite3
+
+# ===== Configurações do cache de detalhes =====
+CACHE_DIR = "cache"
+CACHE_TTL_HORAS = 24                  # revalida/rebusca depois disso; mantenha <= REFRESH_TTL_HORAS
+CACHE_MAX_BYTES = 200 * 1024 * 1024   # orçamento em disco; acima disso despeja por LRU
+
+class CacheEntry:
+    def __init__(self, chave, payload, etag, last_modified, fresca):
+        self.chave = chave
+        self.payload = payload
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresca = fresca
+
+    def validadores(self):
+        """Cabeçalhos condicionais (If-None-Match/If-Modified-Since) para revalidação HTTP."""
+        h = {}
+        if self.etag:
+            h["If-None-Match"] = self.etag
+        if self.last_modified:
+            h["If-Modified-Since"] = self.last_modified
+        return h
+
+class DetailCache:
+    """
+    Cache persistente das linhas de detalhe por categoria.
+    Chave = (código da categoria, fingerprint da requisição). O conteúdo fica em
+    CACHE_DIR/<xx>/<chave>.json e o índice (tamanho, acesso, ETag, Last-Modified) em SQLite.
+    """
+
+    def __init__(self, diretorio=CACHE_DIR, ttl_segundos=CACHE_TTL_HORAS * 3600, max_bytes=CACHE_MAX_BYTES):
+        self.diretorio = diretorio
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidados = 0
+        self.bytes_economizados = 0
+        os.makedirs(diretorio, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(diretorio, "index.sqlite"))
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entradas (
+                chave TEXT PRIMARY KEY,
+                codigo TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                criado_em REAL NOT NULL,
+                acessado_em REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS ix_entradas_acesso ON entradas(acessado_em)")
+        self.db.commit()
+
+    @staticmethod
+    def make_key(codigo, fingerprint):
+        return hashlib.sha256(f"{codigo}\x1f{fingerprint}".encode("utf-8")).hexdigest()
+
+    def _path(self, chave):
+        return os.path.join(self.diretorio, chave[:2], chave + ".json")
+
+    def get(self, codigo, fingerprint):
+        """Devolve a CacheEntry (fresca ou vencida, para revalidação) ou None."""
+        chave = self.make_key(codigo, fingerprint)
+        row = self.db.execute(
+            "SELECT criado_em, etag, last_modified FROM entradas WHERE chave = ?", (chave,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._path(chave), "rb") as f:
+                payload = f.read()
+        except OSError:
+            # arquivo sumiu (limpeza manual?) -> trata como ausente
+            self.db.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+            self.db.commit()
+            return None
+        agora = time.time()
+        self.db.execute("UPDATE entradas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        self.db.commit()
+        fresca = agora - row[0] <= self.ttl_segundos
+        return CacheEntry(chave, payload, row[1], row[2], fresca)
+
+    def put(self, codigo, fingerprint, payload, etag=None, last_modified=None):
+        chave = self.make_key(codigo, fingerprint)
+        path = self._path(chave)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        agora = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO entradas (chave, codigo, tamanho, criado_em, acessado_em, etag, last_modified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (chave, codigo, len(payload), agora, agora, etag, last_modified),
+        )
+        self.db.commit()
+        self._evict()
+
+    def renew(self, entry):
+        """Marca uma entrada revalidada (304) como fresca de novo."""
+        agora = time.time()
+        self.db.execute("UPDATE entradas SET criado_em = ?, acessado_em = ? WHERE chave = ?",
+                        (agora, agora, entry.chave))
+        self.db.commit()
+
+    def _evict(self):
+        """Despeja as entradas menos usadas recentemente até caber em max_bytes."""
+        total = self.db.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for chave, tamanho in self.db.execute(
+            "SELECT chave, tamanho FROM entradas ORDER BY acessado_em ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(chave))
+            except OSError:
+                pass
+            self.db.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+            total -= tamanho
+        self.db.commit()
+
+    def report(self):
+        total = self.hits + self.misses
+        ratio = (self.hits / total * 100) if total else 0.0
+        return (f"Cache de detalhes: {self.hits}/{total} hits ({ratio:.1f}%), "
+                f"{self.revalidados} revalidados, {self.bytes_economizados / 1024:.1f} KiB economizados")
+
+    def close(self):
+        self.db.close()
+
+def is_placeholder(rows):
+    """True se a categoria veio sem nenhum CID (só a linha placeholder [codigo, descricao, "", ""])."""
+    return all(not r[2] for r in rows)
+
+def cached_fetch(cache, codigo, fingerprint, fetch):
+    """
+    Busca as linhas de detalhe passando pelo cache. Serve para qualquer motor de extração:
+    `fetch(validadores)` recebe os cabeçalhos condicionais (dict, possivelmente vazio) e
+    devolve (rows, headers). rows=None significa "não modificado" (HTTP 304); headers pode
+    trazer ETag/Last-Modified. O Selenium ignora os validadores e sempre devolve as linhas.
+    """
+    entry = cache.get(codigo, fingerprint)
+    if entry is not None and entry.fresca:
+        cache.hits += 1
+        cache.bytes_economizados += len(entry.payload)
+        return json.loads(entry.payload)
+
+    validadores = entry.validadores() if entry is not None else {}
+    rows, headers = fetch(validadores)
+    if rows is None and entry is not None:
+        cache.hits += 1
+        cache.revalidados += 1
+        cache.bytes_economizados += len(entry.payload)
+        cache.renew(entry)
+        return json.loads(entry.payload)
+
+    cache.misses += 1
+    if is_placeholder(rows):
+        # detalhe vazio pode ser só a tabela que não carregou a tempo: não prende isso no cache
+        return rows
+    headers = headers or {}
+    payload = json.dumps(rows, ensure_ascii=False).encode("utf-8")
+    cache.put(codigo, fingerprint, payload,
+              etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"))
+    return rows
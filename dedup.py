@@ -0,0 +1,331 @@
+"""
+Gravação idempotente por linha no cids.xlsx: upsert com chave (categoria_codigo, cid_codigo).
+
+O Excel continua só recebendo appends; um índice SQLite (linhas.sqlite) guarda, por chave,
+o hash do conteúdo e o número da linha da versão vigente, e quais categorias foram
+concluídas. Um Bloom filter em memória responde "chave nova" sem ir ao índice; só as
+possíveis repetições são conferidas no SQLite. Assim:
+
+- linha repetida (mesma chave e conteúdo) é descartada;
+- linha alterada é acrescentada e passa a ser a versão vigente;
+- linha que sumiu da categoria deixa de ser vigente;
+- categoria interrompida no meio não conta como processada e é refeita sem duplicar.
+
+A compactação reescreve o Excel em streaming mantendo só as versões vigentes.
+
+O índice guarda uma impressão digital do cids.xlsx (caminho, tamanho, mtime): se o Excel
+foi apagado ou trocado, o índice é refeito a partir dele. Um append interrompido antes de
+o índice ser gravado deixa linhas órfãs no fim da planilha; uma compactação interrompida
+deixa a renumeração pendente. As duas situações são resolvidas ao abrir o índice, e versões
+substituídas que uma execução anterior não chegou a compactar são compactadas na abertura.
+
+Uso:
+    python dedup.py compactar
+    python dedup.py reindexar      # recria o índice a partir do Excel atual
+"""
+import argparse, hashlib, math, os, sqlite3
+
+from storage import EXCEL_PATH, EXCEL_SHEET, HEADER, append_rows_xlsx, iter_numbered_rows_xlsx, xlsx_max_row
+
+ROW_INDEX_PATH = "linhas.sqlite"
+BLOOM_CAPACIDADE = 200_000     # chaves esperadas (a CID-10 tem ~14 mil)
+BLOOM_FALSO_POSITIVO = 0.001
+
+class BloomFilter:
+    def __init__(self, capacidade=BLOOM_CAPACIDADE, falso_positivo=BLOOM_FALSO_POSITIVO):
+        self.m = max(8, int(-capacidade * math.log(falso_positivo) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / capacidade * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def _positions(self, chave):
+        d = hashlib.blake2b(chave.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, chave):
+        for p in self._positions(chave):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, chave):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(chave))
+
+def row_key(categoria_codigo, cid_codigo):
+    return f"{categoria_codigo}\x1f{cid_codigo}"
+
+def row_hash(row):
+    return hashlib.sha256("\x1f".join(row).encode("utf-8")).hexdigest()
+
+def sheet_fingerprint():
+    """Identifica a versão atual do cids.xlsx ("" se não existe)."""
+    try:
+        st = os.stat(EXCEL_PATH)
+    except FileNotFoundError:
+        return ""
+    return f"{os.path.abspath(EXCEL_PATH)}|{st.st_size}|{st.st_mtime_ns}"
+
+class UpsertWriter:
+    def __init__(self, index_path=ROW_INDEX_PATH, capacidade=BLOOM_CAPACIDADE):
+        self.db = sqlite3.connect(index_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS linhas (
+                categoria_codigo TEXT NOT NULL,
+                cid_codigo       TEXT NOT NULL,
+                conteudo         TEXT NOT NULL,
+                linha            INTEGER NOT NULL,
+                PRIMARY KEY (categoria_codigo, cid_codigo)
+            );
+            CREATE INDEX IF NOT EXISTS ix_linhas_linha ON linhas(linha);
+            CREATE TABLE IF NOT EXISTS categorias (codigo TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS renumeracao (
+                categoria_codigo TEXT NOT NULL,
+                cid_codigo       TEXT NOT NULL,
+                linha            INTEGER NOT NULL,
+                PRIMARY KEY (categoria_codigo, cid_codigo)
+            );
+            CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+        """)
+        self.bloom = BloomFilter(capacidade)
+        self.novas = self.alteradas = self.duplicadas = self.removidas = 0
+        self.bloom_negativos = 0
+        self.orfas = 0
+        self._recover()
+        if self._meta("planilha") != sheet_fingerprint():
+            if self.db.execute("SELECT 1 FROM linhas LIMIT 1").fetchone() is not None:
+                print(f"{ROW_INDEX_PATH} não corresponde ao {EXCEL_PATH} atual; reindexando")
+            self.reindex()
+        else:
+            for cat, cid in self.db.execute("SELECT categoria_codigo, cid_codigo FROM linhas"):
+                self.bloom.add(row_key(cat, cid))
+        substituidas = self.superseded_rows()
+        if substituidas:
+            print(f"{EXCEL_PATH}: {substituidas} linhas substituídas ainda não compactadas; compactando")
+            self.compact()
+
+    def _meta(self, chave):
+        row = self.db.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, chave, valor):
+        if valor is None:
+            self.db.execute("DELETE FROM meta WHERE chave = ?", (chave,))
+        else:
+            self.db.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, valor))
+
+    def _recover(self):
+        """Termina uma compactação interrompida e descarta linhas órfãs de um append interrompido."""
+        tmp = self._meta("compactando")
+        if tmp is not None:
+            if os.path.exists(tmp):
+                os.replace(tmp, EXCEL_PATH)   # o arquivo novo ficou pronto antes da marca
+            self._apply_renumbering()
+        if self._meta("anexando") is not None:
+            maior = self.db.execute("SELECT COALESCE(MAX(linha), 1) FROM linhas").fetchone()[0]
+            total = xlsx_max_row()
+            self.orfas = max(0, total - maior)
+            if self.orfas:
+                print(f"{EXCEL_PATH}: {self.orfas} linhas além do índice (gravação interrompida); compactando")
+                self.compact()
+            else:
+                with self.db:
+                    self._set_meta("linhas_planilha", str(total))
+            with self.db:
+                self._set_meta("anexando", None)
+                self._set_meta("planilha", sheet_fingerprint())
+
+    def reindex(self):
+        """
+        Recria o índice a partir do Excel (dados anteriores a este mecanismo, ou Excel trocado).
+        Em chaves repetidas vale a última linha. Toda categoria presente conta como concluída,
+        menos a da última linha, que pode ter sido interrompida no meio e é refeita via upsert.
+        Sem Excel, o índice fica vazio.
+        """
+        with self.db:
+            self.db.execute("DELETE FROM linhas")
+            self.db.execute("DELETE FROM categorias")
+            ultima = None
+            total = 1 if os.path.exists(EXCEL_PATH) else 0
+            if total:
+                for n, r in iter_numbered_rows_xlsx():
+                    total = n
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO linhas (categoria_codigo, cid_codigo, conteudo, linha) VALUES (?, ?, ?, ?)",
+                        (r[0], r[2], row_hash(r), n))
+                    if r[0]:
+                        self.db.execute("INSERT OR IGNORE INTO categorias (codigo) VALUES (?)", (r[0],))
+                    self.bloom.add(row_key(r[0], r[2]))
+                    ultima = r[0]
+            if ultima:
+                self.db.execute("DELETE FROM categorias WHERE codigo = ?", (ultima,))
+            self._set_meta("anexando", None)
+            self._set_meta("linhas_planilha", str(total))
+            self._set_meta("planilha", sheet_fingerprint())
+
+    def completed_categories(self):
+        return {c for (c,) in self.db.execute("SELECT codigo FROM categorias")}
+
+    def upsert_category(self, codigo, rows):
+        """
+        Grava as linhas da categoria com semântica de upsert e a marca como concluída.
+        Chaves da categoria que não vieram em `rows` deixam de ser vigentes.
+        Devolve True se algo mudou no Excel.
+        """
+        return self.upsert_categories([(codigo, rows)])
+
+    def upsert_categories(self, categorias):
+        """upsert_category para várias categorias [(codigo, rows), ...] com um único append no Excel."""
+        pendentes = []   # (row, hash) a gravar
+        vistas_por_cat = {}
+        for codigo, rows in categorias:
+            vistas = vistas_por_cat.setdefault(codigo, set())
+            for r in rows:
+                r = [str(v) for v in r]
+                chave = row_key(r[0], r[2])
+                if chave in vistas:
+                    continue   # repetida dentro da própria categoria
+                vistas.add(chave)
+                h = row_hash(r)
+                if chave not in self.bloom:
+                    self.bloom_negativos += 1
+                    self.novas += 1
+                    pendentes.append((r, h))
+                    continue
+                atual = self.db.execute(
+                    "SELECT conteudo FROM linhas WHERE categoria_codigo = ? AND cid_codigo = ?", (r[0], r[2])).fetchone()
+                if atual is None:
+                    self.novas += 1           # falso positivo do Bloom
+                elif atual[0] == h:
+                    self.duplicadas += 1
+                    continue
+                else:
+                    self.alteradas += 1
+                pendentes.append((r, h))
+
+        # o Excel é gravado antes do índice, com a marca "anexando" antes dele: se cair no meio,
+        # as linhas sem índice são descartadas ao reabrir e a categoria (não concluída) é refeita
+        primeira = None
+        if pendentes:
+            with self.db:
+                self._set_meta("anexando", "1")
+            primeira = append_rows_xlsx([r for r, _ in pendentes])
+        removidas = 0
+        with self.db:
+            for k, (r, h) in enumerate(pendentes):
+                self.db.execute(
+                    "INSERT OR REPLACE INTO linhas (categoria_codigo, cid_codigo, conteudo, linha) VALUES (?, ?, ?, ?)",
+                    (r[0], r[2], h, primeira + k))
+                self.bloom.add(row_key(r[0], r[2]))
+            for codigo, vistas in vistas_por_cat.items():
+                antigas = [cid for (cid,) in self.db.execute(
+                    "SELECT cid_codigo FROM linhas WHERE categoria_codigo = ?", (codigo,))
+                    if row_key(codigo, cid) not in vistas]
+                for cid in antigas:
+                    self.db.execute("DELETE FROM linhas WHERE categoria_codigo = ? AND cid_codigo = ?", (codigo, cid))
+                removidas += len(antigas)
+                if codigo:
+                    self.db.execute("INSERT OR IGNORE INTO categorias (codigo) VALUES (?)", (codigo,))
+            if pendentes:
+                self._set_meta("anexando", None)
+                self._set_meta("linhas_planilha", str(primeira + len(pendentes) - 1))
+                self._set_meta("planilha", sheet_fingerprint())
+        self.removidas += removidas
+        return bool(pendentes or removidas)
+
+    def drop_category(self, codigo):
+        """Tira a categoria do conjunto vigente (e das concluídas)."""
+        self.upsert_category(codigo, [])
+        with self.db:
+            self.db.execute("DELETE FROM categorias WHERE codigo = ?", (codigo,))
+
+    def compact(self):
+        """
+        Reescreve o Excel em streaming só com as versões vigentes (merge das linhas do Excel com
+        o índice ordenado por número de linha) e renumera o índice. Devolve (mantidas, descartadas).
+
+        A numeração nova é gravada (tabela renumeracao + marca "compactando") antes da troca do
+        arquivo; se o processo cair entre a troca e a renumeração, _recover termina o serviço.
+        """
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(EXCEL_SHEET)
+        ws.append(HEADER)
+
+        with self.db:
+            self.db.execute("DELETE FROM renumeracao")
+        vigentes = self.db.cursor()
+        vigentes.execute("SELECT linha, categoria_codigo, cid_codigo FROM linhas ORDER BY linha")
+        prox = vigentes.fetchone()
+        mantidas = descartadas = 0
+        lote = []
+        for n, r in iter_numbered_rows_xlsx():
+            while prox is not None and prox[0] < n:
+                prox = vigentes.fetchone()
+            if prox is not None and prox[0] == n and (prox[1], prox[2]) == (r[0], r[2]):
+                mantidas += 1
+                ws.append(r)
+                lote.append((r[0], r[2], mantidas + 1))
+                if len(lote) >= 5000:
+                    self.db.executemany("INSERT INTO renumeracao VALUES (?, ?, ?)", lote)
+                    lote = []
+            else:
+                descartadas += 1
+        vigentes.close()
+        if lote:
+            self.db.executemany("INSERT INTO renumeracao VALUES (?, ?, ?)", lote)
+
+        tmp = EXCEL_PATH + ".tmp.xlsx"
+        wb.save(tmp)
+        with self.db:
+            self._set_meta("compactando", tmp)
+        os.replace(tmp, EXCEL_PATH)
+        self._apply_renumbering()
+        return mantidas, descartadas
+
+    def _apply_renumbering(self):
+        """Aplica a renumeração da última compactação (o Excel novo já está no lugar)."""
+        with self.db:
+            mantidas = self.db.execute("SELECT COUNT(*) FROM renumeracao").fetchone()[0]
+            self.db.execute(
+                "DELETE FROM linhas WHERE NOT EXISTS (SELECT 1 FROM renumeracao n WHERE "
+                "n.categoria_codigo = linhas.categoria_codigo AND n.cid_codigo = linhas.cid_codigo)")
+            self.db.execute(
+                "UPDATE linhas SET linha = (SELECT n.linha FROM renumeracao n WHERE "
+                "n.categoria_codigo = linhas.categoria_codigo AND n.cid_codigo = linhas.cid_codigo)")
+            self.db.execute("DELETE FROM renumeracao")
+            self._set_meta("compactando", None)
+            self._set_meta("linhas_planilha", str(mantidas + 1))
+            self._set_meta("planilha", sheet_fingerprint())
+
+    def superseded_rows(self):
+        """
+        Linhas do Excel que não são a versão vigente de nenhuma chave (versões substituídas,
+        categorias removidas). Vem do estado do índice, não dos contadores desta execução.
+        """
+        total = self._meta("linhas_planilha")
+        total = int(total) if total is not None else xlsx_max_row()
+        vigentes = self.db.execute("SELECT COUNT(*) FROM linhas").fetchone()[0]
+        return max(0, total - 1 - vigentes)
+
+    def report(self):
+        out = (f"Linhas: {self.novas} novas, {self.alteradas} alteradas, {self.duplicadas} duplicadas "
+               f"descartadas, {self.removidas} removidas ({self.bloom_negativos} resolvidas só pelo Bloom)")
+        if self.orfas:
+            out += f"; {self.orfas} órfãs de gravação interrompida descartadas"
+        return out
+
+    def close(self):
+        self.db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Índice de upsert e compactação do cids.xlsx.")
+    ap.add_argument("comando", choices=["compactar", "reindexar"])
+    args = ap.parse_args()
+
+    w = UpsertWriter()
+    if args.comando == "reindexar":
+        w.reindex()
+        print(f"{ROW_INDEX_PATH}: {len(w.completed_categories())} categorias indexadas")
+    else:
+        mantidas, descartadas = w.compact()
+        print(f"{EXCEL_PATH}: {mantidas} linhas mantidas, {descartadas} descartadas")
+    w.close()
@@ -0,0 +1,123 @@
+"""
+Saída normalizada: tabela de categorias + tabela de CIDs ligada por chave estrangeira.
+
+Cada descrição de categoria é gravada uma única vez e as linhas placeholder do scraper
+(categoria sem detalhe: ["codigo", "descricao", "", ""]) viram só uma categoria sem CIDs.
+Lê o cids.xlsx em streaming, mas guarda categorias e CIDs em memória até o fim da leitura
+(para resolver versões repetidas), e exporta para SQLite (com índices) e/ou CSV.
+
+Uso:
+    python export_normalizado.py [--formato sqlite|csv|ambos]
+"""
+import argparse, csv, os, sqlite3
+
+from storage import iter_rows_xlsx
+
+SQLITE_PATH = "cids.sqlite"
+CSV_CATEGORIAS_PATH = "categorias.csv"
+CSV_CIDS_PATH = "cids.csv"
+BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE categorias (
+    codigo    TEXT PRIMARY KEY,
+    descricao TEXT NOT NULL
+);
+CREATE TABLE cids (
+    codigo           TEXT NOT NULL,
+    categoria_codigo TEXT NOT NULL REFERENCES categorias(codigo),
+    descricao        TEXT NOT NULL,
+    PRIMARY KEY (categoria_codigo, codigo)
+);
+"""
+
+# criados depois da carga (mais rápido que manter os índices durante os inserts)
+INDEXES = """
+CREATE INDEX ix_cids_codigo ON cids(codigo);
+CREATE INDEX ix_categorias_descricao ON categorias(descricao);
+"""
+
+def iter_normalized(rows):
+    """
+    Separa o fluxo denormalizado em ("categoria", codigo, descricao) para cada categoria e
+    ("cid", codigo, categoria_codigo, descricao) para cada CID.
+
+    Uma mesma categoria ou (categoria_codigo, cid_codigo) pode aparecer mais de uma vez
+    (versões antigas ficam no Excel até a compactação); vale a última linha, igual nos dois
+    formatos. Por isso tudo é acumulado em memória (~2 mil categorias e ~14 mil CIDs) e só
+    sai no fim: primeiro as categorias, depois os CIDs, na ordem da primeira aparição.
+    """
+    categorias = {}   # categoria_codigo -> descrição da última linha
+    cids = {}         # (categoria_codigo, cid_codigo) -> descrição da última linha
+    for cat_cod, cat_desc, cid_cod, cid_desc in rows:
+        if not cat_cod:
+            continue
+        categorias[cat_cod] = cat_desc
+        if cid_cod:
+            cids[(cat_cod, cid_cod)] = cid_desc
+    for cat_cod, cat_desc in categorias.items():
+        yield ("categoria", cat_cod, cat_desc)
+    for (cat_cod, cid_cod), cid_desc in cids.items():
+        yield ("cid", cid_cod, cat_cod, cid_desc)
+
+def export_sqlite(path=SQLITE_PATH, rows=None):
+    """Recria o banco SQLite normalizado. Devolve (n_categorias, n_cids)."""
+    rows = iter_rows_xlsx() if rows is None else rows
+    if os.path.exists(path):
+        os.remove(path)
+    db = sqlite3.connect(path)
+    try:
+        db.executescript(SCHEMA)
+        n_cat = n_cid = 0
+        cids = []
+        with db:
+            for item in iter_normalized(rows):
+                if item[0] == "categoria":
+                    db.execute("INSERT INTO categorias (codigo, descricao) VALUES (?, ?)", item[1:])
+                    n_cat += 1
+                else:
+                    cids.append(item[1:])
+                    if len(cids) >= BATCH_SIZE:
+                        db.executemany("INSERT INTO cids (codigo, categoria_codigo, descricao) VALUES (?, ?, ?)", cids)
+                        n_cid += len(cids)
+                        cids = []
+            if cids:
+                db.executemany("INSERT INTO cids (codigo, categoria_codigo, descricao) VALUES (?, ?, ?)", cids)
+                n_cid += len(cids)
+        db.executescript(INDEXES)
+        db.execute("ANALYZE")
+        db.commit()
+        return n_cat, n_cid
+    finally:
+        db.close()
+
+def export_csv(categorias_path=CSV_CATEGORIAS_PATH, cids_path=CSV_CIDS_PATH, rows=None):
+    """Grava categorias.csv e cids.csv (UTF-8). Devolve (n_categorias, n_cids)."""
+    rows = iter_rows_xlsx() if rows is None else rows
+    n_cat = n_cid = 0
+    with open(categorias_path, "w", encoding="utf-8", newline="") as fcat, \
+         open(cids_path, "w", encoding="utf-8", newline="") as fcid:
+        wcat = csv.writer(fcat)
+        wcid = csv.writer(fcid)
+        wcat.writerow(["codigo", "descricao"])
+        wcid.writerow(["codigo", "categoria_codigo", "descricao"])
+        for item in iter_normalized(rows):
+            if item[0] == "categoria":
+                wcat.writerow(item[1:])
+                n_cat += 1
+            else:
+                wcid.writerow(item[1:])
+                n_cid += 1
+    return n_cat, n_cid
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Exporta cids.xlsx em formato normalizado (SQLite/CSV).")
+    ap.add_argument("--formato", choices=["sqlite", "csv", "ambos"], default="ambos")
+    args = ap.parse_args()
+
+    if args.formato in ("sqlite", "ambos"):
+        n_cat, n_cid = export_sqlite()
+        print(f"{SQLITE_PATH}: {n_cat} categorias, {n_cid} CIDs")
+    if args.formato in ("csv", "ambos"):
+        n_cat, n_cid = export_csv()
+        print(f"{CSV_CATEGORIAS_PATH}/{CSV_CIDS_PATH}: {n_cat} categorias, {n_cid} CIDs")
@@ -0,0 +1,127 @@
+"""
+Exporta o Excel de staging (cids.xlsx) para Parquet e/ou Arrow IPC.
+
+As colunas de categoria (que se repetem em todas as linhas de CID) saem
+dictionary-encoded; a leitura do Excel é em streaming e a escrita é feita em
+lotes de ROW_GROUP_SIZE linhas, então a memória fica limitada ao lote.
+
+Uso:
+    python export_parquet.py [--formato parquet|arrow|ambos] [--compressao zstd] [--row-group 65536]
+"""
+import argparse
+
+from storage import HEADER, iter_rows_xlsx
+
+PARQUET_PATH = "cids.parquet"
+ARROW_PATH = "cids.arrow"
+COMPRESSION = "zstd"      # parquet: none/snappy/gzip/brotli/lz4/zstd; arrow: none/lz4/zstd
+ROW_GROUP_SIZE = 64 * 1024
+
+DICT_COLUMNS = ("categoria_codigo", "categoria_descricao")
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError:
+        raise SystemExit("pyarrow não está instalado: pip install pyarrow")
+    return pyarrow
+
+def build_schema(pa):
+    return pa.schema([
+        pa.field(c, pa.dictionary(pa.int32(), pa.string()) if c in DICT_COLUMNS else pa.string())
+        for c in HEADER
+    ])
+
+class _RunningDictionary:
+    """
+    Dicionário que só cresce: cada lote reaproveita os índices anteriores e acrescenta os
+    valores novos no fim. Assim o Arrow IPC consegue gravar só os deltas de dicionário
+    (o formato de arquivo não aceita substituição de dicionário).
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, pa, column):
+        idx = []
+        for v in column:
+            i = self.index.get(v)
+            if i is None:
+                i = len(self.values)
+                self.index[v] = i
+                self.values.append(v)
+            idx.append(i)
+        return pa.DictionaryArray.from_arrays(pa.array(idx, pa.int32()), pa.array(self.values, pa.string()))
+
+def iter_record_batches(pa, rows, batch_size=ROW_GROUP_SIZE):
+    """Agrupa as linhas em RecordBatches de até `batch_size` linhas."""
+    schema = build_schema(pa)
+    dicts = {c: _RunningDictionary() for c in DICT_COLUMNS}
+    cols = [[] for _ in HEADER]
+
+    def flush():
+        arrays = []
+        for name, values in zip(HEADER, cols):
+            if name in dicts:
+                arrays.append(dicts[name].encode(pa, values))
+            else:
+                arrays.append(pa.array(values, pa.string()))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    n = 0
+    for r in rows:
+        for c, v in zip(cols, r):
+            c.append(v)
+        n += 1
+        if n == batch_size:
+            yield flush()
+            cols = [[] for _ in HEADER]
+            n = 0
+    if n:
+        yield flush()
+
+def export_parquet(path=PARQUET_PATH, compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE, rows=None):
+    """Grava Parquet com um row group por lote. Devolve o número de linhas."""
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+    rows = iter_rows_xlsx() if rows is None else rows
+    total = 0
+    with pq.ParquetWriter(path, build_schema(pa), compression=compression,
+                          use_dictionary=list(DICT_COLUMNS)) as writer:
+        for batch in iter_record_batches(pa, rows, row_group_size):
+            writer.write_batch(batch, row_group_size=row_group_size)
+            total += batch.num_rows
+    return total
+
+def export_arrow(path=ARROW_PATH, compression=COMPRESSION, batch_size=ROW_GROUP_SIZE, rows=None):
+    """Grava Arrow IPC (formato de arquivo) com deltas de dicionário. Devolve o número de linhas."""
+    pa = _require_pyarrow()
+    rows = iter_rows_xlsx() if rows is None else rows
+    ipc_compression = None if compression in (None, "none") else compression
+    if ipc_compression not in (None, "lz4", "zstd"):
+        raise ValueError(f"compressão '{compression}' não suportada no Arrow IPC (use lz4, zstd ou none)")
+    options = pa.ipc.IpcWriteOptions(compression=ipc_compression, emit_dictionary_deltas=True)
+    total = 0
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, build_schema(pa), options=options) as writer:
+            for batch in iter_record_batches(pa, rows, batch_size):
+                writer.write_batch(batch)
+                total += batch.num_rows
+    return total
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Exporta cids.xlsx para Parquet/Arrow IPC.")
+    ap.add_argument("--formato", choices=["parquet", "arrow", "ambos"], default="ambos")
+    ap.add_argument("--compressao", default=COMPRESSION)
+    ap.add_argument("--row-group", type=int, default=ROW_GROUP_SIZE)
+    args = ap.parse_args()
+
+    if args.formato in ("parquet", "ambos"):
+        n = export_parquet(compression=args.compressao, row_group_size=args.row_group)
+        print(f"{PARQUET_PATH}: {n} linhas")
+    if args.formato in ("arrow", "ambos"):
+        n = export_arrow(compression=args.compressao, batch_size=args.row_group)
+        print(f"{ARROW_PATH}: {n} linhas")
@@ -0,0 +1,336 @@
+"""
+Fila de trabalho com leases para vários scrapers em paralelo (inclusive em máquinas diferentes).
+
+Cada categoria é um item da fila. Um worker pega itens com lease (prazo de posse), renova
+o prazo com heartbeats enquanto trabalha e, ao terminar, grava as linhas e marca o item como
+concluído na mesma transação, desde que ainda seja dono do lease. Se o worker morrer, o lease
+vence e o item volta a ficar disponível para outro worker. Os resultados têm chave
+(categoria_codigo, cid_codigo), então uma reentrega não gera linhas duplicadas.
+
+O backend padrão é SQLite (num disco compartilhado, ou local para um host só); outro backend
+pode ser plugado implementando a interface de WorkQueue.
+
+Uso:
+    python fila.py status
+    python fila.py exportar        # grava no cids.xlsx os resultados ainda não exportados
+"""
+import argparse, os, socket, sqlite3, threading, time, uuid
+
+from dedup import UpsertWriter
+
+QUEUE_PATH = "fila.sqlite"
+LEASE_SEGUNDOS = 120       # prazo do lease; o heartbeat renova a cada LEASE_SEGUNDOS/3
+MAX_TENTATIVAS = 5         # depois disso o item fica como "falhou"
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class WorkItem:
+    def __init__(self, codigo, descricao, pagina, indice, token):
+        self.codigo = codigo
+        self.descricao = descricao
+        self.pagina = pagina
+        self.indice = indice
+        self.token = token
+
+    def __repr__(self):
+        return f"WorkItem({self.codigo!r}, pagina={self.pagina}, indice={self.indice})"
+
+class WorkQueue:
+    """Interface da fila; SqliteWorkQueue é a implementação padrão."""
+
+    def enqueue(self, itens):
+        """itens: iterável de (codigo, descricao, pagina, indice). Ignora códigos já enfileirados."""
+        raise NotImplementedError
+
+    def lease(self, worker_id, n=1):
+        """Pega até n itens pendentes (ou com lease vencido). Devolve lista de WorkItem."""
+        raise NotImplementedError
+
+    def heartbeat(self, item):
+        """Renova o lease. False se o lease foi perdido (venceu e outro worker pegou)."""
+        raise NotImplementedError
+
+    def complete(self, item, rows):
+        """Grava as linhas e conclui o item, se o lease ainda for nosso. Devolve bool."""
+        raise NotImplementedError
+
+    def release(self, item, erro=None):
+        """Devolve o item para a fila (falha do worker)."""
+        raise NotImplementedError
+
+    def claim_seeding(self, worker_id):
+        """
+        Reserva a semeadura da fila para este worker. True se coube a ele semear; False se a
+        fila já está semeada ou outro worker semeia (e renovou a reserva dentro do prazo do lease).
+        """
+        raise NotImplementedError
+
+    def renew_seeding(self, worker_id):
+        """Renova a reserva de semeadura. False se ela passou para outro worker."""
+        raise NotImplementedError
+
+    def mark_seeded(self):
+        raise NotImplementedError
+
+    def is_seeded(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def iter_results(self, excluir_categorias=()):
+        raise NotImplementedError
+
+    def keep_alive(self, item, intervalo=None):
+        """Context manager que roda heartbeats em background enquanto o item é processado."""
+        return _Heartbeat(self, item, intervalo or LEASE_SEGUNDOS / 3)
+
+class _Heartbeat:
+    def __init__(self, queue, item, intervalo):
+        self.queue = queue
+        self.item = item
+        self.intervalo = intervalo
+        self.perdido = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.intervalo):
+            if not self.queue.heartbeat(self.item):
+                self.perdido = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+class SqliteWorkQueue(WorkQueue):
+    """
+    Fila em SQLite. Cada operação abre sua própria conexão (seguro entre threads e processos)
+    e as mudanças de estado usam BEGIN IMMEDIATE, que serializa os escritores. Em disco de
+    rede, o SQLite depende do lock de arquivo do sistema de arquivos compartilhado; por isso
+    o journal fica no modo padrão (WAL não funciona em NFS/SMB).
+    """
+
+    def __init__(self, path=QUEUE_PATH, lease_segundos=LEASE_SEGUNDOS, max_tentativas=MAX_TENTATIVAS):
+        self.path = path
+        self.lease_segundos = lease_segundos
+        self.max_tentativas = max_tentativas
+        with self._connect() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS itens (
+                    codigo       TEXT PRIMARY KEY,
+                    descricao    TEXT NOT NULL,
+                    pagina       INTEGER NOT NULL,
+                    indice       INTEGER NOT NULL,
+                    estado       TEXT NOT NULL DEFAULT 'pendente',  -- pendente/em_andamento/concluido/falhou
+                    worker       TEXT,
+                    lease_token  TEXT,
+                    lease_expira REAL,
+                    tentativas   INTEGER NOT NULL DEFAULT 0,
+                    erro         TEXT,
+                    concluido_em REAL
+                );
+                CREATE INDEX IF NOT EXISTS ix_itens_estado ON itens(estado, pagina, indice);
+                CREATE TABLE IF NOT EXISTS resultados (
+                    categoria_codigo    TEXT NOT NULL,
+                    categoria_descricao TEXT NOT NULL,
+                    cid_codigo          TEXT NOT NULL,
+                    cid_descricao       TEXT NOT NULL,
+                    PRIMARY KEY (categoria_codigo, cid_codigo)
+                );
+                CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT);
+            """)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        db.execute("PRAGMA busy_timeout = 60000")
+        return _Conn(db)
+
+    def enqueue(self, itens):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT OR IGNORE INTO itens (codigo, descricao, pagina, indice) VALUES (?, ?, ?, ?)",
+                list(itens))
+            db.execute("COMMIT")
+
+    def lease(self, worker_id, n=1):
+        agora = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            # lease vencido sem tentativas sobrando: o worker morreu de novo, não reentrega
+            db.execute(
+                "UPDATE itens SET estado = 'falhou', lease_token = NULL, lease_expira = NULL, "
+                "erro = COALESCE(erro, 'lease vencido após o limite de tentativas') "
+                "WHERE estado = 'em_andamento' AND lease_expira < ? AND tentativas >= ?",
+                (agora, self.max_tentativas))
+            rows = db.execute(
+                "SELECT codigo, descricao, pagina, indice FROM itens "
+                "WHERE estado = 'pendente' OR (estado = 'em_andamento' AND lease_expira < ?) "
+                "ORDER BY pagina, indice LIMIT ?", (agora, n)).fetchall()
+            itens = []
+            for codigo, descricao, pagina, indice in rows:
+                token = uuid.uuid4().hex
+                db.execute(
+                    "UPDATE itens SET estado = 'em_andamento', worker = ?, lease_token = ?, "
+                    "lease_expira = ?, tentativas = tentativas + 1 WHERE codigo = ?",
+                    (worker_id, token, agora + self.lease_segundos, codigo))
+                itens.append(WorkItem(codigo, descricao, pagina, indice, token))
+            db.execute("COMMIT")
+            return itens
+
+    def heartbeat(self, item):
+        with self._connect() as db:
+            cur = db.execute(
+                "UPDATE itens SET lease_expira = ? WHERE codigo = ? AND lease_token = ? AND estado = 'em_andamento'",
+                (time.time() + self.lease_segundos, item.codigo, item.token))
+            return cur.rowcount == 1
+
+    def complete(self, item, rows):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            dono = db.execute(
+                "SELECT 1 FROM itens WHERE codigo = ? AND lease_token = ? AND estado = 'em_andamento'",
+                (item.codigo, item.token)).fetchone()
+            if not dono:
+                db.execute("ROLLBACK")
+                return False
+            db.execute("DELETE FROM resultados WHERE categoria_codigo = ?", (item.codigo,))
+            db.executemany(
+                "INSERT OR REPLACE INTO resultados (categoria_codigo, categoria_descricao, cid_codigo, cid_descricao) "
+                "VALUES (?, ?, ?, ?)", [tuple(r) for r in rows])
+            db.execute(
+                "UPDATE itens SET estado = 'concluido', lease_token = NULL, lease_expira = NULL, "
+                "erro = NULL, concluido_em = ? WHERE codigo = ?", (time.time(), item.codigo))
+            db.execute("COMMIT")
+            return True
+
+    def release(self, item, erro=None):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE itens SET estado = CASE WHEN tentativas >= ? THEN 'falhou' ELSE 'pendente' END, "
+                "lease_token = NULL, lease_expira = NULL, erro = ? WHERE codigo = ? AND lease_token = ?",
+                (self.max_tentativas, erro, item.codigo, item.token))
+
+    def claim_seeding(self, worker_id):
+        agora = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            reserva = dict(db.execute(
+                "SELECT chave, valor FROM meta WHERE chave IN ('semeada', 'semeando', 'semeando_em')").fetchall())
+            livre = "semeada" not in reserva and (
+                reserva.get("semeando") in (None, worker_id)
+                or float(reserva.get("semeando_em", 0)) < agora - self.lease_segundos)
+            if livre:
+                db.executemany("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)",
+                               [("semeando", worker_id), ("semeando_em", repr(agora))])
+            db.execute("COMMIT")
+            return livre
+
+    def renew_seeding(self, worker_id):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            dono = db.execute("SELECT valor FROM meta WHERE chave = 'semeando'").fetchone()
+            if not dono or dono[0] != worker_id:
+                db.execute("ROLLBACK")
+                return False
+            db.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('semeando_em', ?)", (repr(time.time()),))
+            db.execute("COMMIT")
+            return True
+
+    def mark_seeded(self):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('semeada', '1')")
+            db.execute("DELETE FROM meta WHERE chave IN ('semeando', 'semeando_em')")
+            db.execute("COMMIT")
+
+    def is_seeded(self):
+        with self._connect() as db:
+            return db.execute("SELECT 1 FROM meta WHERE chave = 'semeada'").fetchone() is not None
+
+    def stats(self):
+        with self._connect() as db:
+            out = dict(db.execute("SELECT estado, COUNT(*) FROM itens GROUP BY estado").fetchall())
+            out["linhas"] = db.execute("SELECT COUNT(*) FROM resultados").fetchone()[0]
+            out["workers_ativos"] = db.execute(
+                "SELECT COUNT(DISTINCT worker) FROM itens WHERE estado = 'em_andamento' AND lease_expira >= ?",
+                (time.time(),)).fetchone()[0]
+            return out
+
+    def iter_results(self, excluir_categorias=()):
+        """Linhas de resultado em ordem de categoria, pulando as categorias em `excluir_categorias`."""
+        with self._connect() as db:
+            for r in db.execute(
+                "SELECT categoria_codigo, categoria_descricao, cid_codigo, cid_descricao FROM resultados "
+                "ORDER BY categoria_codigo, cid_codigo"):
+                if r[0] not in excluir_categorias:
+                    yield list(r)
+
+class _Conn:
+    """Conexão que fecha ao sair do `with` (o sqlite3.Connection só faz commit/rollback)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def execute(self, *a):
+        return self.db.execute(*a)
+
+    def executemany(self, *a):
+        return self.db.executemany(*a)
+
+    def executescript(self, *a):
+        return self.db.executescript(*a)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None and self.db.in_transaction:
+            self.db.execute("ROLLBACK")
+        self.db.close()
+        return False
+
+def export_results(queue, lote=200):
+    """
+    Grava (upsert) no cids.xlsx as categorias concluídas na fila que ainda não estão
+    concluídas no Excel, em lotes de `lote` categorias. Devolve o número de linhas.
+    """
+    writer = UpsertWriter()
+    ja = writer.completed_categories()
+    n = 0
+    buf = []   # [(codigo, rows)]
+    try:
+        for r in queue.iter_results(excluir_categorias=ja):
+            if not buf or buf[-1][0] != r[0]:
+                if len(buf) >= lote:
+                    writer.upsert_categories(buf)
+                    buf = []
+                buf.append((r[0], []))
+            buf[-1][1].append(r)
+            n += 1
+        if buf:
+            writer.upsert_categories(buf)
+    finally:
+        writer.close()
+    return n
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fila de trabalho distribuída do scraper.")
+    ap.add_argument("comando", choices=["status", "exportar"])
+    ap.add_argument("--fila", default=QUEUE_PATH)
+    args = ap.parse_args()
+
+    q = SqliteWorkQueue(args.fila)
+    if args.comando == "status":
+        for k, v in sorted(q.stats().items()):
+            print(f"{k:>16}: {v}")
+    else:
+        print(f"{export_results(q)} linhas exportadas para o Excel")
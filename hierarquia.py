@@ -0,0 +1,219 @@
+"""
+Índice de intervalos da hierarquia CID-10 (capítulo e bloco) para cada código.
+
+Capítulos e blocos são intervalos de categorias (ex.: bloco K35-K38 dentro do capítulo
+XI, K00-K93). Cada categoria vira um inteiro (letra * 100 + número), os intervalos ficam em
+arrays ordenados pelo início e a consulta é uma busca binária: O(log n) por código e, com
+numpy instalado, um único searchsorted para o lote inteiro.
+
+Os capítulos são fixos na CID-10 e vêm embutidos (ou de CID-10-CAPITULOS); os blocos vêm de
+CID-10-GRUPOS do DATASUS (os mesmos arquivos do importador). As categorias raspadas são
+conferidas contra os intervalos: as que não caem em nenhum bloco são reportadas.
+
+Uso:
+    python hierarquia.py DIRETORIO_DATASUS     # gera cids_hierarquia.xlsx a partir do cids.xlsx
+    python hierarquia.py DIRETORIO_DATASUS K35.8
+"""
+import argparse, os
+from bisect import bisect_right
+
+from storage import HEADER, EXCEL_SHEET, iter_rows_xlsx
+from importar_datasus import find_table, iter_table
+
+ENRICHED_PATH = "cids_hierarquia.xlsx"
+GRUPOS_BASENAME = "CID-10-GRUPOS"
+CAPITULOS_BASENAME = "CID-10-CAPITULOS"
+BATCH_SIZE = 50000
+EXTRA_HEADER = ["capitulo", "capitulo_descricao", "bloco", "bloco_descricao"]
+
+# (número, início, fim, descrição)
+CAPITULOS = [
+    ("I", "A00", "B99", "Algumas doenças infecciosas e parasitárias"),
+    ("II", "C00", "D48", "Neoplasias [tumores]"),
+    ("III", "D50", "D89", "Doenças do sangue e dos órgãos hematopoéticos e alguns transtornos imunitários"),
+    ("IV", "E00", "E90", "Doenças endócrinas, nutricionais e metabólicas"),
+    ("V", "F00", "F99", "Transtornos mentais e comportamentais"),
+    ("VI", "G00", "G99", "Doenças do sistema nervoso"),
+    ("VII", "H00", "H59", "Doenças do olho e anexos"),
+    ("VIII", "H60", "H95", "Doenças do ouvido e da apófise mastóide"),
+    ("IX", "I00", "I99", "Doenças do aparelho circulatório"),
+    ("X", "J00", "J99", "Doenças do aparelho respiratório"),
+    ("XI", "K00", "K93", "Doenças do aparelho digestivo"),
+    ("XII", "L00", "L99", "Doenças da pele e do tecido subcutâneo"),
+    ("XIII", "M00", "M99", "Doenças do sistema osteomuscular e do tecido conjuntivo"),
+    ("XIV", "N00", "N99", "Doenças do aparelho geniturinário"),
+    ("XV", "O00", "O99", "Gravidez, parto e puerpério"),
+    ("XVI", "P00", "P96", "Algumas afecções originadas no período perinatal"),
+    ("XVII", "Q00", "Q99", "Malformações congênitas, deformidades e anomalias cromossômicas"),
+    ("XVIII", "R00", "R99", "Sintomas, sinais e achados anormais de exames clínicos e de laboratório, "
+                             "não classificados em outra parte"),
+    ("XIX", "S00", "T98", "Lesões, envenenamento e algumas outras conseqüências de causas externas"),
+    ("XX", "V01", "Y98", "Causas externas de morbidade e de mortalidade"),
+    ("XXI", "Z00", "Z99", "Fatores que influenciam o estado de saúde e o contato com os serviços de saúde"),
+    ("XXII", "U04", "U99", "Códigos para propósitos especiais"),
+]
+
+def category_key(codigo):
+    """A00 -> 0, K35.8 -> 1035, Z99 -> 2599; -1 se não for um código CID-10."""
+    c = codigo.strip().upper()
+    if len(c) < 3 or not ("A" <= c[0] <= "Z") or not c[1:3].isdigit():
+        return -1
+    return (ord(c[0]) - 65) * 100 + int(c[1:3])
+
+def category_keys(codigos):
+    """category_key vetorizado: com numpy, converte o lote inteiro sem laço em Python."""
+    try:
+        import numpy as np
+    except ImportError:
+        return [category_key(c) for c in codigos]
+    try:
+        raw = np.array([c.strip() for c in codigos], dtype="S3")
+    except UnicodeEncodeError:
+        return np.asarray([category_key(c) for c in codigos], dtype=np.int32)
+    b = raw.view(np.uint8).reshape(-1, 3).astype(np.int32) if len(raw) else np.zeros((0, 3), np.int32)
+    letra = np.where((b[:, 0] >= 97) & (b[:, 0] <= 122), b[:, 0] - 32, b[:, 0]) - 65
+    d1, d2 = b[:, 1] - 48, b[:, 2] - 48
+    ok = (letra >= 0) & (letra < 26) & (d1 >= 0) & (d1 <= 9) & (d2 >= 0) & (d2 <= 9)
+    return np.where(ok, letra * 100 + d1 * 10 + d2, -1).astype(np.int32)
+
+def roman_chapter(numcap):
+    """Número do capítulo em algarismos romanos, como em CAPITULOS ("11" -> "XI"; "XI" fica)."""
+    n = str(numcap).strip()
+    if not n.isdigit():
+        return n.upper()
+    n = int(n)
+    out = ""
+    for valor, simbolo in ((10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")):
+        while n >= valor:
+            out += simbolo
+            n -= valor
+    return out
+
+class _Intervals:
+    """Intervalos disjuntos [inicio, fim] ordenados pelo início."""
+
+    def __init__(self, itens):
+        itens = sorted(itens, key=lambda t: t[0])
+        # a busca binária só acha o intervalo certo se não houver sobreposição (ex.: um grupo
+        # que engloba outros faria os códigos depois do grupo interno caírem em -1)
+        for a, b in zip(itens, itens[1:]):
+            if b[0] <= a[1]:
+                raise ValueError(f"intervalos sobrepostos: {a[2]} e {b[2]}")
+        self.inicios = [t[0] for t in itens]
+        self.fins = [t[1] for t in itens]
+        self.rotulos = [t[2] for t in itens]
+        self.descricoes = [t[3] for t in itens]
+        self._np = None
+
+    def find(self, k):
+        """Posição do intervalo que contém k, ou -1."""
+        i = bisect_right(self.inicios, k) - 1
+        return i if i >= 0 and k <= self.fins[i] else -1
+
+    def find_many(self, keys):
+        """Versão em lote; com numpy é um searchsorted só."""
+        try:
+            import numpy as np
+        except ImportError:
+            return [self.find(k) for k in keys]
+        if self._np is None:
+            self._np = (np.asarray(self.inicios, dtype=np.int32), np.asarray(self.fins, dtype=np.int32))
+        inicios, fins = self._np
+        keys = np.asarray(keys, dtype=np.int32)
+        if len(inicios) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        i = np.searchsorted(inicios, keys, side="right") - 1
+        ok = (i >= 0) & (keys >= 0) & (keys <= fins[np.maximum(i, 0)])
+        return np.where(ok, i, -1)
+
+class HierarchyIndex:
+    def __init__(self, capitulos, blocos):
+        """capitulos/blocos: listas de (rotulo, inicio, fim, descricao) com códigos de categoria."""
+        self.capitulos = _Intervals(
+            [(category_key(a), category_key(b), rot, desc) for rot, a, b, desc in capitulos])
+        self.blocos = _Intervals(
+            [(category_key(a), category_key(b), f"{a}-{b}", desc) for _, a, b, desc in blocos])
+
+    @classmethod
+    def from_datasus(cls, diretorio):
+        """Blocos de CID-10-GRUPOS; capítulos de CID-10-CAPITULOS se existir, senão os embutidos."""
+        blocos = [(None, r["CATINIC"], r["CATFIM"], r.get("DESCRICAO", ""))
+                  for r in iter_table(find_table(diretorio, GRUPOS_BASENAME))]
+        try:
+            cap_path = find_table(diretorio, CAPITULOS_BASENAME)
+        except FileNotFoundError:
+            capitulos = CAPITULOS
+        else:
+            capitulos = [(roman_chapter(r.get("NUMCAP", "")), r["CATINIC"], r["CATFIM"], r.get("DESCRICAO", ""))
+                         for r in iter_table(cap_path)]
+        return cls(capitulos, blocos)
+
+    def _fields(self, ic, ib):
+        cap = self.capitulos
+        blo = self.blocos
+        return [
+            cap.rotulos[ic] if ic >= 0 else "", cap.descricoes[ic] if ic >= 0 else "",
+            blo.rotulos[ib] if ib >= 0 else "", blo.descricoes[ib] if ib >= 0 else "",
+        ]
+
+    def lookup(self, codigo):
+        """K35.8 -> {"capitulo", "capitulo_descricao", "bloco", "bloco_descricao"} (vazios se fora)."""
+        k = category_key(codigo)
+        return dict(zip(EXTRA_HEADER, self._fields(self.capitulos.find(k), self.blocos.find(k))))
+
+    def lookup_batch(self, codigos):
+        """Lote de códigos -> (índices de capítulo, índices de bloco); -1 onde não há intervalo."""
+        keys = category_keys(codigos)
+        return self.capitulos.find_many(keys), self.blocos.find_many(keys)
+
+    def enrich(self, rows):
+        """Acrescenta as quatro colunas de hierarquia às linhas, em lotes de BATCH_SIZE."""
+        lote = []
+        for r in rows:
+            lote.append(r)
+            if len(lote) >= BATCH_SIZE:
+                yield from self._enrich_batch(lote)
+                lote = []
+        if lote:
+            yield from self._enrich_batch(lote)
+
+    def _enrich_batch(self, rows):
+        caps, blocos = self.lookup_batch([r[2] or r[0] for r in rows])
+        for r, ic, ib in zip(rows, caps, blocos):
+            yield list(r) + self._fields(int(ic), int(ib))
+
+    def uncovered(self, categorias):
+        """Categorias que não caem em nenhum bloco (intervalos incompletos ou código estranho)."""
+        return [c for c in categorias if self.blocos.find(category_key(c)) < 0]
+
+def write_enriched_xlsx(index, path=ENRICHED_PATH, rows=None):
+    """Grava o Excel enriquecido em modo write_only (streaming). Devolve o número de linhas."""
+    from openpyxl import Workbook
+    rows = iter_rows_xlsx() if rows is None else rows
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(EXCEL_SHEET)
+    ws.append(HEADER + EXTRA_HEADER)
+    n = 0
+    for r in index.enrich(rows):
+        ws.append(r)
+        n += 1
+    tmp = path + ".tmp.xlsx"
+    wb.save(tmp)
+    os.replace(tmp, path)
+    return n
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Hierarquia CID-10 (capítulo/bloco) por intervalos.")
+    ap.add_argument("diretorio", help="diretório com CID-10-GRUPOS (e opcionalmente CID-10-CAPITULOS)")
+    ap.add_argument("codigo", nargs="?", help="consulta um código em vez de gerar o Excel enriquecido")
+    args = ap.parse_args()
+
+    idx = HierarchyIndex.from_datasus(args.diretorio)
+    if args.codigo:
+        print(idx.lookup(args.codigo))
+    else:
+        categorias = sorted({r[0] for r in iter_rows_xlsx() if r[0]})
+        fora = idx.uncovered(categorias)
+        if fora:
+            print(f"{len(fora)} categorias fora de qualquer bloco: {', '.join(fora[:20])}")
+        print(f"{ENRICHED_PATH}: {write_enriched_xlsx(idx)} linhas")
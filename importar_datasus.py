@@ -0,0 +1,199 @@
+"""
+Importa as tabelas oficiais da CID-10 do DATASUS (CSV ou DBF) como alternativa ao scraping.
+
+Lê CID-10-CATEGORIAS e CID-10-SUBCATEGORIAS do disco em streaming (só as categorias,
+~2 mil, ficam em memória), converte para as mesmas quatro colunas do scraper e grava no
+mesmo Excel e no mesmo store de hashes do modo refresh. Categorias já presentes no Excel
+são puladas, como na retomada do scraper.
+
+Com --reconciliar não grava nada: compara os dados oficiais com o que foi raspado e
+gera reconciliacao.json.
+
+Uso:
+    python importar_datasus.py CAMINHO_DOS_ARQUIVOS [--reconciliar]
+"""
+import argparse, csv, json, os, struct
+
+from storage import iter_rows_xlsx
+from dedup import UpsertWriter
+from incremental import load_hash_store, save_hash_store, listing_hash, new_delta, record_category
+
+ENCODING = "latin-1"          # os arquivos do DATASUS vêm em ISO-8859-1
+CATEGORIAS_BASENAME = "CID-10-CATEGORIAS"
+SUBCATEGORIAS_BASENAME = "CID-10-SUBCATEGORIAS"
+FLUSH_CATEGORIAS = 200        # categorias acumuladas antes de cada gravação no Excel
+RECONCILIACAO_PATH = "reconciliacao.json"
+
+# ---------- Leitores ----------
+def iter_csv(path):
+    """Linhas do CSV do DATASUS (separador ';') como dicts com chaves em maiúsculo."""
+    with open(path, "r", encoding=ENCODING, newline="") as f:
+        reader = csv.reader(f, delimiter=";")
+        header = [h.strip().upper() for h in next(reader)]
+        for row in reader:
+            if row:
+                yield dict(zip(header, (v.strip() for v in row)))
+
+def iter_dbf(path):
+    """Leitor mínimo de dBase III: percorre os registros sem carregar o arquivo inteiro."""
+    with open(path, "rb") as f:
+        n_registros, header_len, registro_len = struct.unpack("<xxxxIHH20x", f.read(32))
+        campos = []
+        while True:
+            desc = f.read(32)
+            if not desc or desc[0] == 0x0D:
+                break
+            nome = desc[:11].split(b"\0", 1)[0].decode("ascii").strip().upper()
+            campos.append((nome, desc[16]))
+        f.seek(header_len)
+        for _ in range(n_registros):
+            rec = f.read(registro_len)
+            if len(rec) < registro_len:
+                break
+            if rec[:1] == b"*":  # registro apagado
+                continue
+            out, pos = {}, 1
+            for nome, tamanho in campos:
+                out[nome] = rec[pos:pos + tamanho].decode(ENCODING).strip()
+                pos += tamanho
+            yield out
+
+def find_table(diretorio, basename):
+    """Acha BASENAME.CSV/.DBF no diretório (sem diferenciar maiúsculas)."""
+    alvos = {f"{basename}.csv".lower(), f"{basename}.dbf".lower()}
+    for nome in sorted(os.listdir(diretorio)):
+        if nome.lower() in alvos:
+            return os.path.join(diretorio, nome)
+    raise FileNotFoundError(f"{basename}.CSV/.DBF não encontrado em {diretorio}")
+
+def iter_table(path):
+    return iter_dbf(path) if path.lower().endswith(".dbf") else iter_csv(path)
+
+# ---------- Conversão ----------
+def format_subcat(subcat):
+    """A000 -> A00.0 (formato do site); códigos de 3 caracteres ficam como estão."""
+    subcat = subcat.strip().upper()
+    return subcat if len(subcat) <= 3 or "." in subcat else f"{subcat[:3]}.{subcat[3:]}"
+
+def iter_categories_with_rows(categorias_path, subcategorias_path):
+    """
+    Merge-join das duas tabelas (ambas ordenadas por código no DATASUS).
+    Gera (categoria_codigo, categoria_descricao, rows) por categoria, com rows no formato
+    do scraper; categoria sem subcategorias vira a mesma linha placeholder do scraper.
+    """
+    categorias = {}
+    for r in iter_table(categorias_path):
+        cat = r.get("CAT", "").upper()
+        if cat:
+            categorias[cat] = r.get("DESCRICAO", "")
+    ordem = sorted(categorias)
+
+    pos = 0
+    atual, rows = None, []
+    ultimo_sub = ""
+    for r in iter_table(subcategorias_path):
+        sub = r.get("SUBCAT", "").upper()
+        if not sub:
+            continue
+        if sub < ultimo_sub:
+            raise ValueError(f"{subcategorias_path}: subcategorias fora de ordem ({ultimo_sub} > {sub})")
+        ultimo_sub = sub
+        cat = sub[:3]
+        if cat != atual:
+            if atual is not None:
+                yield atual, categorias.get(atual, ""), rows
+            # categorias sem subcategoria que ficaram no caminho
+            while pos < len(ordem) and ordem[pos] < cat:
+                if ordem[pos] != atual:
+                    c = ordem[pos]
+                    yield c, categorias[c], [[c, categorias[c], "", ""]]
+                pos += 1
+            if pos < len(ordem) and ordem[pos] == cat:
+                pos += 1
+            atual, rows = cat, []
+        rows.append([cat, categorias.get(cat, ""), format_subcat(sub), r.get("DESCRICAO", "")])
+    if atual is not None:
+        yield atual, categorias.get(atual, ""), rows
+    for c in ordem[pos:]:
+        if c != atual:
+            yield c, categorias[c], [[c, categorias[c], "", ""]]
+
+# ---------- Importação ----------
+def import_tables(categorias_path, subcategorias_path):
+    """Grava (upsert) no Excel/hashes as categorias ainda não concluídas. Devolve (n_categorias, n_linhas)."""
+    writer = UpsertWriter()
+    processed = writer.completed_categories()
+    hash_store = load_hash_store()
+    delta = new_delta()
+    n_cat = n_linhas = 0
+    pendentes = []
+
+    def flush():
+        writer.upsert_categories(pendentes)
+        save_hash_store(hash_store)
+
+    try:
+        for codigo, descricao, rows in iter_categories_with_rows(categorias_path, subcategorias_path):
+            if codigo in processed:
+                continue
+            record_category(hash_store, codigo, listing_hash(codigo, descricao), rows, delta)
+            pendentes.append((codigo, rows))
+            n_cat += 1
+            n_linhas += len(rows)
+            if len(pendentes) >= FLUSH_CATEGORIAS:
+                flush()
+                pendentes = []
+        if pendentes:
+            flush()
+    finally:
+        writer.close()
+    return n_cat, n_linhas
+
+# ---------- Reconciliação ----------
+def _norm(texto):
+    return " ".join(texto.split())
+
+def reconcile(categorias_path, subcategorias_path, scraped_rows=None):
+    """
+    Compara os dados oficiais com os raspados por (categoria_codigo, cid_codigo).
+    Devolve {"so_oficial", "so_raspado", "descricao_diferente"}.
+    """
+    scraped_rows = iter_rows_xlsx() if scraped_rows is None else scraped_rows
+    raspado = {}
+    for cat, cat_desc, cid, cid_desc in scraped_rows:
+        if cat:
+            raspado[(cat, cid)] = cid_desc if cid else cat_desc
+
+    out = {"so_oficial": [], "so_raspado": [], "descricao_diferente": []}
+    for _, _, rows in iter_categories_with_rows(categorias_path, subcategorias_path):
+        for cat, cat_desc, cid, cid_desc in rows:
+            oficial = cid_desc if cid else cat_desc
+            chave = (cat, cid)
+            if chave not in raspado:
+                out["so_oficial"].append({"categoria_codigo": cat, "cid_codigo": cid, "descricao": oficial})
+                continue
+            rasp = raspado.pop(chave)
+            if _norm(rasp) != _norm(oficial):
+                out["descricao_diferente"].append({"categoria_codigo": cat, "cid_codigo": cid,
+                                                   "oficial": oficial, "raspado": rasp})
+    for (cat, cid), desc in raspado.items():
+        out["so_raspado"].append({"categoria_codigo": cat, "cid_codigo": cid, "descricao": desc})
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Importa as tabelas CID-10 do DATASUS (CSV/DBF).")
+    ap.add_argument("diretorio", help="diretório com CID-10-CATEGORIAS e CID-10-SUBCATEGORIAS (.CSV ou .DBF)")
+    ap.add_argument("--reconciliar", action="store_true", help="só compara com o Excel raspado")
+    args = ap.parse_args()
+
+    cat_path = find_table(args.diretorio, CATEGORIAS_BASENAME)
+    sub_path = find_table(args.diretorio, SUBCATEGORIAS_BASENAME)
+    if args.reconciliar:
+        diff = reconcile(cat_path, sub_path)
+        with open(RECONCILIACAO_PATH, "w", encoding="utf-8") as f:
+            json.dump(diff, f, ensure_ascii=False, indent=2)
+        print(f"{RECONCILIACAO_PATH}: {len(diff['so_oficial'])} só no oficial, "
+              f"{len(diff['so_raspado'])} só no raspado, {len(diff['descricao_diferente'])} com descrição diferente")
+    else:
+        n_cat, n_linhas = import_tables(cat_path, sub_path)
+        print(f"Importadas {n_cat} categorias ({n_linhas} linhas)")
@@ -0,0 +1,114 @@
+import os, json, time, hashlib
+
+# ===== Arquivos do modo refresh =====
+HASHES_PATH = "hashes.json"
+DELTA_PATH = "delta.json"
+
+# ---------- Hashes ----------
+def listing_hash(codigo, descricao):
+    """Hash barato da entrada da listagem (código + descrição da categoria)."""
+    return hashlib.sha256(f"{codigo}\x1f{descricao}".encode("utf-8")).hexdigest()
+
+def content_hash(cids):
+    """Hash do conteúdo de detalhe: dict {cid_codigo: cid_descricao}, independente da ordem."""
+    payload = json.dumps(sorted(cids.items()), ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def rows_to_cids(rows):
+    """Converte linhas [cat_cod, cat_desc, cid_cod, cid_desc] em {cid_codigo: cid_descricao}.
+    Linhas placeholder (sem cid_codigo) são ignoradas."""
+    return {r[2]: r[3] for r in rows if r[2]}
+
+# ---------- Armazenamento ----------
+def load_hash_store():
+    """
+    Lê HASHES_PATH. Formato:
+    {"categorias": {codigo: {"listagem", "conteudo", "cids", "atualizado_em"}}}
+    """
+    if not os.path.exists(HASHES_PATH):
+        return {"categorias": {}}
+    with open(HASHES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_hash_store(store):
+    """Grava o store de forma atômica (arquivo temporário + os.replace)."""
+    tmp = HASHES_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(store, f, ensure_ascii=False)
+    os.replace(tmp, HASHES_PATH)
+
+def seed_from_rows(store, rows):
+    """
+    Preenche o store com as categorias que já estão no Excel mas ainda não têm hash
+    (dados de execuções anteriores a este mecanismo). Ficam com atualizado_em=0, ou seja,
+    vencidas: serão buscadas de novo, mas o delta sai correto.
+    """
+    cats = store["categorias"]
+    novos = {}
+    for r in rows:
+        codigo = r[0]
+        if not codigo or codigo in cats:
+            continue
+        novos.setdefault(codigo, {})
+        if r[2]:
+            novos[codigo][r[2]] = r[3]
+    for codigo, cids in novos.items():
+        cats[codigo] = {"listagem": "", "conteudo": content_hash(cids), "cids": cids, "atualizado_em": 0}
+    return len(novos)
+
+def needs_refresh(store, codigo, lhash, ttl_segundos, agora=None):
+    """True se a categoria é nova, mudou na listagem ou passou do TTL."""
+    entry = store["categorias"].get(codigo)
+    if entry is None or entry.get("listagem") != lhash:
+        return True
+    agora = time.time() if agora is None else agora
+    return agora - entry.get("atualizado_em", 0) > ttl_segundos
+
+# ---------- Delta ----------
+def new_delta():
+    return {"adicionados": [], "removidos": [], "alterados": []}
+
+def record_category(store, codigo, lhash, rows, delta, agora=None):
+    """
+    Atualiza o store com as linhas recém-coletadas da categoria e acumula em `delta`
+    os CIDs adicionados/removidos/alterados. Retorna True se o conteúdo mudou.
+    """
+    cids = rows_to_cids(rows)
+    chash = content_hash(cids)
+    entry = store["categorias"].get(codigo)
+    old = entry["cids"] if entry else {}
+    mudou = entry is None or entry.get("conteudo") != chash
+
+    if mudou:
+        for cid, desc in cids.items():
+            if cid not in old:
+                delta["adicionados"].append({"categoria_codigo": codigo, "cid_codigo": cid, "cid_descricao": desc})
+            elif old[cid] != desc:
+                delta["alterados"].append({"categoria_codigo": codigo, "cid_codigo": cid,
+                                           "antes": old[cid], "depois": desc})
+        for cid, desc in old.items():
+            if cid not in cids:
+                delta["removidos"].append({"categoria_codigo": codigo, "cid_codigo": cid, "cid_descricao": desc})
+
+    store["categorias"][codigo] = {
+        "listagem": lhash,
+        "conteudo": chash,
+        "cids": cids,
+        "atualizado_em": time.time() if agora is None else agora,
+    }
+    return mudou
+
+def drop_missing_categories(store, seen_codes, delta):
+    """
+    Remove do store as categorias que não apareceram na listagem completa e registra
+    seus CIDs como removidos. Retorna a lista de códigos removidos.
+    """
+    sumidas = [c for c in store["categorias"] if c not in seen_codes]
+    for codigo in sumidas:
+        for cid, desc in store["categorias"].pop(codigo)["cids"].items():
+            delta["removidos"].append({"categoria_codigo": codigo, "cid_codigo": cid, "cid_descricao": desc})
+    return sumidas
+
+def save_delta(delta):
+    with open(DELTA_PATH, "w", encoding="utf-8") as f:
+        json.dump(delta, f, ensure_ascii=False, indent=2)
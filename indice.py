@@ -0,0 +1,239 @@
+"""
+Índice de consulta rápida dos CIDs, num único arquivo binário memory-mappable.
+
+- tabela de entradas (categorias + CIDs) ordenada pela chave do código (maiúsculo, sem ponto),
+  para lookup exato e por prefixo com busca binária direto no mmap;
+- índice invertido de termos (descrições com acentos removidos) para busca textual.
+
+Uso:
+    python indice.py            # gera cids.idx a partir do cids.xlsx
+    python indice.py K35        # consulta rápida (código, prefixo ou texto)
+"""
+import argparse, mmap, os, re, struct, threading, unicodedata
+
+from storage import iter_rows_xlsx
+
+INDEX_PATH = "cids.idx"
+
+MAGIC = b"CIDX0002"
+# magic, n_entradas, n_termos, n_postings, off_entradas, off_termos, off_postings, off_heap
+_HEADER = struct.Struct("<8sIIIQQQQ")
+# key_off, key_len, code_off, code_len, desc_off, desc_len, cat_off, cat_len (código da categoria pai; 0 = é categoria)
+_ENTRY = struct.Struct("<IHIHIHIH")
+# term_off, term_len, postings_off, postings_count
+_TERM = struct.Struct("<IHII")
+_POSTING = struct.Struct("<I")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# ---------- Normalização ----------
+def code_key(codigo):
+    """Chave de ordenação/consulta do código: maiúsculo e sem ponto (K35.8 -> K358)."""
+    return codigo.strip().upper().replace(".", "")
+
+def fold(texto):
+    """Minúsculo e sem acentos (ç -> c, ã -> a)."""
+    nfkd = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(ch for ch in nfkd if not unicodedata.combining(ch))
+
+def tokenize(texto):
+    return _TOKEN_RE.findall(fold(texto))
+
+# ---------- Construção ----------
+def build_index(path=INDEX_PATH, rows=None):
+    """Gera o índice em uma passada sobre as linhas do scraper. Devolve o número de entradas."""
+    rows = iter_rows_xlsx() if rows is None else rows
+
+    # chave -> (código, descrição, código da categoria pai ou None). Vale a última linha
+    # (como no upsert), mas a categoria prevalece sobre um CID com a mesma chave (o DATASUS
+    # lista A33 como subcategoria de A33).
+    entradas = {}
+    for cat_cod, cat_desc, cid_cod, cid_desc in rows:
+        if cat_cod:
+            entradas[code_key(cat_cod)] = (cat_cod, cat_desc, None)
+        if cid_cod:
+            k = code_key(cid_cod)
+            atual = entradas.get(k)
+            if k != code_key(cat_cod) and (atual is None or atual[2] is not None):
+                entradas[k] = (cid_cod, cid_desc, cat_cod)
+
+    keys = sorted(entradas)
+
+    heap = bytearray()
+
+    def put(s):
+        b = s.encode("utf-8")[:0xFFFF]
+        off = len(heap)
+        heap.extend(b)
+        return off, len(b)
+
+    entry_bytes = bytearray()
+    postings_por_termo = {}
+    for i, k in enumerate(keys):
+        codigo, desc, pai = entradas[k]
+        key_off, key_len = put(k)
+        code_off, code_len = put(codigo)
+        desc_off, desc_len = put(desc)
+        cat_off, cat_len = put(pai or "")
+        entry_bytes += _ENTRY.pack(key_off, key_len, code_off, code_len, desc_off, desc_len, cat_off, cat_len)
+        for t in set(tokenize(desc)):
+            postings_por_termo.setdefault(t, []).append(i)
+
+    term_bytes = bytearray()
+    posting_bytes = bytearray()
+    n_postings = 0
+    for t in sorted(postings_por_termo):
+        lista = postings_por_termo[t]  # já em ordem crescente (entradas percorridas em ordem)
+        t_off, t_len = put(t)
+        term_bytes += _TERM.pack(t_off, t_len, n_postings, len(lista))
+        for p in lista:
+            posting_bytes += _POSTING.pack(p)
+        n_postings += len(lista)
+
+    off_entradas = _HEADER.size
+    off_termos = off_entradas + len(entry_bytes)
+    off_postings = off_termos + len(term_bytes)
+    off_heap = off_postings + len(posting_bytes)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(keys), len(postings_por_termo), n_postings,
+                             off_entradas, off_termos, off_postings, off_heap))
+        f.write(entry_bytes)
+        f.write(term_bytes)
+        f.write(posting_bytes)
+        f.write(heap)
+    os.replace(tmp, path)
+    return len(keys)
+
+# ---------- Consulta ----------
+class CidIndex:
+    """
+    Leitor do índice. O arquivo só é aberto (mmap) na primeira consulta e nada é
+    desserializado de antemão: as buscas binárias leem direto das páginas mapeadas.
+    Pode ser compartilhado entre threads (o mmap é somente leitura).
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._mm = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._mm is None:
+            with self._lock:
+                if self._mm is None:
+                    with open(self.path, "rb") as f:
+                        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    (magic, self._n_ent, self._n_term, _, self._off_ent, self._off_term,
+                     self._off_post, self._off_heap) = _HEADER.unpack_from(mm, 0)
+                    if magic != MAGIC:
+                        mm.close()
+                        raise ValueError(f"{self.path}: não é um índice de CIDs (magic {magic!r})")
+                    self._mm = mm
+        return self._mm
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _str(self, off, length):
+        start = self._off_heap + off
+        return self._mm[start:start + length]
+
+    def _entry_key(self, i):
+        key_off, key_len = _ENTRY.unpack_from(self._mm, self._off_ent + i * _ENTRY.size)[:2]
+        return self._str(key_off, key_len)
+
+    def _entry(self, i):
+        _, _, code_off, code_len, desc_off, desc_len, cat_off, cat_len = _ENTRY.unpack_from(
+            self._mm, self._off_ent + i * _ENTRY.size)
+        return {
+            "codigo": self._str(code_off, code_len).decode("utf-8"),
+            "descricao": self._str(desc_off, desc_len).decode("utf-8"),
+            "categoria_codigo": self._str(cat_off, cat_len).decode("utf-8") if cat_len else None,
+        }
+
+    def _term(self, i):
+        t_off, t_len, p_off, p_count = _TERM.unpack_from(self._mm, self._off_term + i * _TERM.size)
+        return self._str(t_off, t_len), p_off, p_count
+
+    @staticmethod
+    def _lower_bound(n, key_at, alvo):
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key_at(mid) < alvo:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, codigo):
+        """Código -> {"codigo", "descricao", "categoria_codigo"} ou None."""
+        self._open()
+        alvo = code_key(codigo).encode("utf-8")
+        i = self._lower_bound(self._n_ent, self._entry_key, alvo)
+        if i < self._n_ent and self._entry_key(i) == alvo:
+            return self._entry(i)
+        return None
+
+    def prefix(self, prefixo, limite=None):
+        """Todas as entradas cujo código começa com `prefixo` (ex.: "K35" -> K35, K35.0, ...)."""
+        self._open()
+        alvo = code_key(prefixo).encode("utf-8")
+        i = self._lower_bound(self._n_ent, self._entry_key, alvo)
+        out = []
+        while i < self._n_ent and self._entry_key(i).startswith(alvo):
+            out.append(self._entry(i))
+            if limite is not None and len(out) >= limite:
+                break
+            i += 1
+        return out
+
+    def _postings(self, termo, como_prefixo=False):
+        alvo = termo.encode("utf-8")
+        i = self._lower_bound(self._n_term, lambda k: self._term(k)[0], alvo)
+        ids = set()
+        while i < self._n_term:
+            t, p_off, p_count = self._term(i)
+            if t != alvo and not (como_prefixo and t.startswith(alvo)):
+                break
+            start = self._off_post + p_off * _POSTING.size
+            ids.update(x[0] for x in _POSTING.iter_unpack(self._mm[start:start + p_count * _POSTING.size]))
+            if not como_prefixo:
+                break
+            i += 1
+        return ids
+
+    def search(self, texto, limite=20):
+        """
+        Busca textual sem acentos: todas as palavras precisam aparecer na descrição
+        (a última vale como prefixo, para autocompletar). Resultados em ordem de código.
+        """
+        self._open()
+        tokens = tokenize(texto)
+        if not tokens:
+            return []
+        ids = None
+        for n, t in enumerate(tokens):
+            found = self._postings(t, como_prefixo=(n == len(tokens) - 1))
+            ids = found if ids is None else ids & found
+            if not ids:
+                return []
+        return [self._entry(i) for i in sorted(ids)[:limite]]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Gera/consulta o índice de CIDs (cids.idx).")
+    ap.add_argument("consulta", nargs="?", help="código, prefixo ou texto; sem argumento, (re)gera o índice")
+    args = ap.parse_args()
+
+    if args.consulta is None:
+        n = build_index()
+        print(f"{INDEX_PATH}: {n} entradas")
+    else:
+        idx = CidIndex()
+        hit = idx.lookup(args.consulta)
+        resultados = [hit] if hit else (idx.prefix(args.consulta, limite=50) or idx.search(args.consulta))
+        for r in resultados:
+            print(f"{r['codigo']:<8} {r['descricao']}")
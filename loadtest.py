@@ -0,0 +1,93 @@
+"""
+Teste de carga do servidor de CIDs: N threads com conexões keep-alive disparando uma
+mistura de consultas (lookup, prefixo, busca, lote) por um tempo fixo.
+Reporta requisições/s e latências p50/p99.
+
+Uso:
+    python servidor.py &                   # numa outra janela
+    python loadtest.py [--url http://127.0.0.1:8000] [--threads 8] [--segundos 10]
+"""
+import argparse, http.client, json, random, threading, time
+from urllib.parse import urlsplit, quote
+
+import indice
+import storage
+
+def make_requests(rows, n=2000, seed=0):
+    """Monta uma lista de (metodo, caminho, corpo) a partir de códigos reais do Excel."""
+    rnd = random.Random(seed)
+    amostra = rnd.sample(rows, min(n, len(rows)))
+    codigos = [r[2] or r[0] for r in amostra]
+    palavras = [w for r in amostra[:200] for w in indice.tokenize(r[3] or r[1])[:1] if len(w) > 3] or ["doenca"]
+    reqs = []
+    for _ in range(n):
+        r = rnd.random()
+        if r < 0.70:
+            reqs.append(("GET", "/cid/" + quote(rnd.choice(codigos)), None))
+        elif r < 0.85:
+            reqs.append(("GET", "/prefixo/" + quote(rnd.choice(codigos)[:3]), None))
+        elif r < 0.95:
+            reqs.append(("GET", "/busca?q=" + quote(rnd.choice(palavras)), None))
+        else:
+            corpo = json.dumps({"codigos": rnd.sample(codigos, min(50, len(codigos)))}).encode("utf-8")
+            reqs.append(("POST", "/lote", corpo))
+    return reqs
+
+def worker(host, port, reqs, fim, latencias, erros, seed):
+    rnd = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    local = []
+    while time.perf_counter() < fim:
+        metodo, caminho, corpo = rnd.choice(reqs)
+        t0 = time.perf_counter()
+        try:
+            headers = {"Content-Type": "application/json"} if corpo else {}
+            conn.request(metodo, caminho, body=corpo, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 500:
+                erros.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            erros.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        local.append(time.perf_counter() - t0)
+    conn.close()
+    latencias.extend(local)
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    k = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[k]
+
+def run(url, threads, segundos):
+    u = urlsplit(url)
+    reqs = make_requests(list(storage.iter_rows_xlsx()))
+    latencias, erros = [], []
+    fim = time.perf_counter() + segundos
+    ts = [threading.Thread(target=worker, args=(u.hostname, u.port or 80, reqs, fim, latencias, erros, i))
+          for i in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    dt = time.perf_counter() - t0
+
+    latencias.sort()
+    print(f"{len(latencias)} requisições em {dt:.1f}s com {threads} threads keep-alive")
+    print(f"  {len(latencias) / dt:,.0f} req/s")
+    print(f"  p50 {percentil(latencias, 50) * 1000:.2f} ms   p99 {percentil(latencias, 99) * 1000:.2f} ms   "
+          f"máx {latencias[-1] * 1000 if latencias else 0:.2f} ms")
+    if erros:
+        print(f"  {len(erros)} erros (ex.: {erros[0]})")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Teste de carga do servidor de CIDs.")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--segundos", type=float, default=10)
+    args = ap.parse_args()
+    run(args.url, args.threads, args.segundos)
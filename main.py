@@ -4,86 +4,42 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, ElementClickInterceptedException
-import time, random, os, json
-from openpyxl import Workbook, load_workbook
+import re, time
+from storage import iter_rows_xlsx, load_progress, save_progress
+from dedup import UpsertWriter
+from cache import DetailCache, cached_fetch
+from fila import SqliteWorkQueue, default_worker_id
+from rate_limit import TokenBucket
+from incremental import (
+    load_hash_store, save_hash_store, seed_from_rows, listing_hash, needs_refresh,
+    new_delta, record_category, drop_missing_categories, save_delta,
+)
 
 # ===== Configurações de espera =====
 WAIT_SHORT = 10        # cliques/cookies
 WAIT_LONG  = 60        # carregamentos de páginas/tabelas
 POLL_SLEEP = 0.25      # intervalo do polling leve
-POST_CLICK_SLEEP = 0.35  # pausa pós-clique para animações
 
-# ===== Arquivos de saída/checkpoint =====
-EXCEL_PATH = "cids.xlsx"
-EXCEL_SHEET = "dados"
-PROGRESS_PATH = "progress.json"
+SITE_URL = "https://www.cremesp.org.br/?siteAcao=cid10"
 
-# ---------- Utilitários Excel (openpyxl) ----------
-def ensure_workbook():
-    """
-    Garante que o arquivo EXCEL_PATH exista com a planilha e cabeçalho.
-    """
-    if not os.path.exists(EXCEL_PATH):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = EXCEL_SHEET
-        ws.append(["categoria_codigo", "categoria_descricao", "cid_codigo", "cid_descricao"])
-        wb.save(EXCEL_PATH)
-    else:
-        wb = load_workbook(EXCEL_PATH)
-        if EXCEL_SHEET not in wb.sheetnames:
-            ws = wb.create_sheet(EXCEL_SHEET)
-            ws.append(["categoria_codigo", "categoria_descricao", "cid_codigo", "cid_descricao"])
-            wb.save(EXCEL_PATH)
+# ===== Modo refresh (re-scrape incremental) =====
+REFRESH_MODE = False       # True: percorre a listagem inteira e só rebusca o que mudou/venceu
+REFRESH_TTL_HORAS = 24     # idade máxima dos dados de uma categoria antes de rebuscar
 
-def load_processed_categories_from_xlsx():
-    """
-    Lê o Excel e devolve um set com os códigos de categoria já processados (coluna A).
-    Ignora vazios.
-    """
-    ensure_workbook()
-    processed = set()
-    wb = load_workbook(EXCEL_PATH, read_only=True, data_only=True)
-    ws = wb[EXCEL_SHEET]
-    first = True
-    for row in ws.iter_rows(values_only=True):
-        if first:
-            first = False
-            continue  # pula cabeçalho
-        if not row:
-            continue
-        cod = (row[0] or "").strip() if isinstance(row[0], str) else (str(row[0]) if row[0] is not None else "")
-        if cod:
-            processed.add(cod)
-    wb.close()
-    return processed
+# ===== Modo fila (vários scrapers em paralelo) =====
+QUEUE_PATH = None          # ex.: "fila.sqlite" (em disco compartilhado) para rodar como worker
+WORKER_ID = default_worker_id()
+QUEUE_POLL_SLEEP = 15      # segundos entre consultas quando a fila está vazia mas há itens com outros workers
 
-def append_rows_xlsx(rows):
-    """
-    Acrescenta linhas ao Excel incrementalmente.
-    rows: lista de listas [categoria_codigo, categoria_descricao, cid_codigo, cid_descricao]
-    """
-    ensure_workbook()
-    wb = load_workbook(EXCEL_PATH)
-    ws = wb[EXCEL_SHEET]
-    for r in rows:
-        ws.append(r)
-    wb.save(EXCEL_PATH)
-    wb.close()
-
-# ---------- Checkpoint ----------
-def load_progress():
-    if not os.path.exists(PROGRESS_PATH):
-        return {"pagina_atual": 1, "proximo_indice_da_pagina": 0}
-    with open(PROGRESS_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_progress(pagina_atual, proximo_indice_da_pagina):
-    data = {"pagina_atual": pagina_atual, "proximo_indice_da_pagina": proximo_indice_da_pagina}
-    with open(PROGRESS_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# ===== Ritmo de requisições (token bucket compartilhado) =====
+RATE_LIMIT_RPS = 2.0       # taxa inicial; sobe/desce sozinha entre os limites de rate_limit.py
+RATE_LIMIT_BURST = 4
+RATE_LIMIT_PATH = None     # None: balde só deste processo (no modo fila, usa o arquivo da fila)
 
 # ---------- Selenium helpers ----------
+detail_cache = DetailCache()
+limiter = TokenBucket(RATE_LIMIT_RPS, RATE_LIMIT_BURST, path=RATE_LIMIT_PATH or QUEUE_PATH)
+
 opts = Options()
 opts.add_argument("--headless=new")
 opts.add_argument("--disable-notifications")
@@ -132,27 +88,40 @@ def safe_click(elem):
     except Exception:
         driver.execute_script("arguments[0].click();", elem)
 
-def click_and_wait(clickable, locator_to_wait, max_tries=3, base_sleep=POST_CLICK_SLEEP):
+def throttle_status():
+    """429/503 se a página atual é a resposta de limite/indisponibilidade do servidor, senão None."""
+    try:
+        titulo = (driver.title or "").lower()
+    except Exception:
+        return None
+    if "429" in titulo or "too many requests" in titulo:
+        return 429
+    if "503" in titulo or "service unavailable" in titulo or "temporarily unavailable" in titulo:
+        return 503
+    return None
+
+def click_and_wait(clickable, locator_to_wait, max_tries=3):
     """
     Clica em `clickable` e espera `locator_to_wait` aparecer.
-    Tenta com backoff para lidar com latência/overlay.
+    O ritmo vem do limiter: cada tentativa consome um token e cada timeout (ou 429/503)
+    reduz a taxa e pausa todos os scrapers que compartilham o balde.
     """
     for attempt in range(1, max_tries + 1):
+        limiter.acquire()
         scroll_center(clickable)
         try:
             clickable.click()
         except (ElementClickInterceptedException, StaleElementReferenceException, Exception):
             driver.execute_script("arguments[0].click();", clickable)
 
-        # micro-pausa para permitir render/transição
-        time.sleep(base_sleep + (attempt - 1) * 0.25 + random.uniform(0, 0.15))
         try:
             WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located(locator_to_wait))
+            limiter.reward()
             return True
         except TimeoutException:
+            limiter.penalize(throttle_status())
             if attempt == max_tries:
                 return False
-            time.sleep(0.4 + 0.2 * attempt)
     return False
 
 def click_voltar():
@@ -165,9 +134,11 @@ def click_voltar():
         )
         ok = click_and_wait(btn_voltar, (By.ID, "tbCategorias"), max_tries=2)
         if not ok:
+            limiter.acquire()
             driver.back()
             WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "tbCategorias")))
     except TimeoutException:
+        limiter.acquire()
         driver.back()
         WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "tbCategorias")))
 
@@ -198,6 +169,7 @@ def go_next_page() -> bool:
                 return ""
 
         before_key = first_row_key()
+        limiter.acquire()
         safe_click(next_btn)
 
         WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "tbCategorias")))
@@ -251,6 +223,7 @@ def go_next_page() -> bool:
                     continue
 
                 before_key = first_row_key()
+                limiter.acquire()
                 safe_click(btn)
 
                 try:
@@ -268,6 +241,26 @@ def go_next_page() -> bool:
             continue
     return False
 
+def last_page_reached() -> bool:
+    """True só se a paginação do DataTables mostra o botão de próxima página desabilitado."""
+    try:
+        switch_into_categorias(driver, wait)
+        cls = (driver.find_element(By.ID, "tbCategorias_next").get_attribute("class") or "").lower()
+        return "disabled" in cls
+    except Exception:
+        return False
+
+def listing_total():
+    """Total de registros informado pelo DataTables ("Mostrando 1 até 100 de 2.045 registros"), ou None."""
+    try:
+        texto = driver.find_element(By.ID, "tbCategorias_info").text or ""
+    except Exception:
+        return None
+    numeros = re.findall(r"\b(?:de|of)\s+([\d.,]+)", texto)
+    if not numeros:
+        return None
+    return int(re.sub(r"[.,]", "", numeros[-1]))
+
 def set_page_size_100():
     """Seleciona 100 resultados por página no seletor #tbCategorias_length > label > select e
     espera a tabela redesenhar (mais linhas na página)."""
@@ -280,6 +273,7 @@ def set_page_size_100():
     linhas_antes = driver.find_elements(By.CSS_SELECTOR, "#tbCategorias > tbody > tr")
     num_antes = len(linhas_antes)
 
+    limiter.acquire()
     try:
         sel = Select(select_el)
         try:
@@ -298,15 +292,57 @@ def set_page_size_100():
         if len(linhas_depois) > num_antes or linhas_depois != linhas_antes:
             break
 
-# ========= INÍCIO =========
-try:
-    # Progresso + categorias já processadas (para evitar duplicados ao retomar)
-    progress = load_progress()
-    processed_codes = load_processed_categories_from_xlsx()
-    pagina_alvo = progress.get("pagina_atual", 1)
-    i_alvo = progress.get("proximo_indice_da_pagina", 0)
+def detail_fingerprint(lhash):
+    """Fingerprint da requisição de detalhe: página de origem + entrada da listagem."""
+    return f"{SITE_URL}#{lhash}"
+
+def open_and_collect_details(botao, codigo, descricao):
+    """
+    Abre o detalhe da categoria (botão do olho), coleta as linhas de CIDs e volta pra lista.
+    Devolve lista de linhas [categoria_codigo, categoria_descricao, cid_codigo, cid_descricao];
+    categoria sem detalhe vira uma linha placeholder.
+    """
+    # abre detalhe (espera pelo botão Voltar)
+    ok = click_and_wait(botao, (By.ID, "btnVoltarTbListCategorias"), max_tries=3)
+    if not ok:
+        limiter.acquire()
+        driver.execute_script("arguments[0].click();", botao)
+        WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "btnVoltarTbListCategorias")))
+
+    # coleta linhas de CIDs (se houver)
+    tabela = driver.find_elements(By.ID, "tabela_body")
+    if not tabela:
+        tabela = driver.find_elements(By.CSS_SELECTOR, "[id*='tabela_body']")
+
+    detalhas = []
+    if tabela:
+        for _ in range(int(8 / POLL_SLEEP)):  # ~8s
+            detalhas = driver.find_elements(By.CSS_SELECTOR, "[id*='tabela_body'] > tr")
+            if detalhas:
+                break
+            time.sleep(POLL_SLEEP)
+
+    out_rows = []
+    if detalhas:
+        for row in detalhas:
+            cols = row.find_elements(By.TAG_NAME, "td")
+            if len(cols) >= 2:
+                cid_codigo = (cols[0].text or "").strip()
+                cid_desc   = (cols[1].text or "").strip()
+                out_rows.append([codigo, descricao, cid_codigo, cid_desc])
+    else:
+        # registre categorias sem detalhe, se quiser manter
+        out_rows.append([codigo, descricao, "", ""])
 
-    driver.get("https://www.cremesp.org.br/?siteAcao=cid10")
+    # volta pra lista
+    click_voltar()
+    switch_into_categorias(driver, wait)
+    return out_rows
+
+def open_listing():
+    """Abre a listagem de categorias, aceita cookies e seta 100 por página. Devolve a página (1)."""
+    limiter.acquire()
+    driver.get(SITE_URL)
 
     # Aceitar cookies se aparecer
     try:
@@ -320,23 +356,66 @@ try:
     # Entrar no contexto correto e setar 100 por página
     switch_into_categorias(driver, wait)
     set_page_size_100()
+    return 1
 
-    # ===== LOOP PRINCIPAL: percorre todas as páginas =====
-    pagina = 1
-    i = 0  # índice corrente na página
+def wait_listing_ready():
+    """Depois de trocar de página: volta ao contexto da tabela e espera as linhas aparecerem."""
+    switch_into_categorias(driver, wait)
+    WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "tbCategorias")))
+    set_page_size_100()
+    for _ in range(40):
+        time.sleep(POLL_SLEEP)
+        if driver.find_elements(By.CSS_SELECTOR, "#tbCategorias > tbody > tr"):
+            break
 
-    # Retomada: avança até a página alvo
-    while pagina < pagina_alvo:
+def advance_to_page(pagina, destino):
+    """
+    Navega da página `pagina` até `destino` (a paginação só anda pra frente; se o destino
+    ficou pra trás, reabre a listagem). Devolve a página em que parou.
+    """
+    if destino < pagina:
+        pagina = open_listing()
+    while pagina < destino:
         if not go_next_page():
             break
         pagina += 1
-        switch_into_categorias(driver, wait)
-        WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "tbCategorias")))
-        set_page_size_100()
-        for _ in range(40):
-            time.sleep(POLL_SLEEP)
-            if driver.find_elements(By.CSS_SELECTOR, "#tbCategorias > tbody > tr"):
-                break
+        wait_listing_ready()
+    return pagina
+
+def eye_button(linha):
+    """Botão do olho (abre o detalhe) de uma linha da listagem, ou None."""
+    candid = linha.find_elements(By.CSS_SELECTOR, "td:nth-child(3) button")
+    if not candid:
+        candid = linha.find_elements(By.XPATH, ".//td[3]//button | .//td[3]//a")
+    return candid[0] if candid else None
+
+def run_sequential():
+    """Modo padrão: um único processo percorre a listagem com o cursor do progress.json."""
+    # Progresso + categorias já concluídas (para evitar duplicados ao retomar);
+    # categoria interrompida no meio não entra aqui e é refeita via upsert
+    progress = load_progress()
+    row_writer = UpsertWriter()
+    processed_codes = row_writer.completed_categories()
+    pagina_alvo = progress.get("pagina_atual", 1)
+    i_alvo = progress.get("proximo_indice_da_pagina", 0)
+
+    # Hashes de conteúdo por categoria (base do modo refresh)
+    hash_store = load_hash_store()
+    delta = new_delta()
+    seen_codes = set()
+    listagem_completa = False
+    if REFRESH_MODE:
+        semeadas = seed_from_rows(hash_store, iter_rows_xlsx())
+        if semeadas:
+            print(f"Refresh: {semeadas} categorias do Excel sem hash (serão rebuscadas)")
+        pagina_alvo, i_alvo = 1, 0  # refresh sempre varre a listagem inteira
+
+    # ===== LOOP PRINCIPAL: percorre todas as páginas =====
+    pagina = open_listing()
+    i = 0  # índice corrente na página
+
+    # Retomada: avança até a página alvo
+    pagina = advance_to_page(pagina, pagina_alvo)
 
     # começa do índice salvo, se houver retomada
     i = i_alvo
@@ -351,17 +430,17 @@ try:
             save_progress(pagina + 1, 0)
             if go_next_page():
                 pagina += 1
-                switch_into_categorias(driver, wait)
-                WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "tbCategorias")))
-                set_page_size_100()
-                for _ in range(40):
-                    time.sleep(POLL_SLEEP)
-                    if driver.find_elements(By.CSS_SELECTOR, "#tbCategorias > tbody > tr"):
-                        break
+                wait_listing_ready()
                 i = 0
                 save_progress(pagina, i)
                 continue
             else:
+                # go_next_page() também devolve False em falha transitória; a varredura só
+                # conta como completa se a paginação (ou o total do DataTables) confirmar
+                total = listing_total()
+                listagem_completa = last_page_reached() or (total is not None and total == len(seen_codes))
+                if REFRESH_MODE and not listagem_completa:
+                    print("Aviso: não foi possível confirmar a última página; categorias ausentes não serão removidas")
                 break  # acabou TODAS as páginas
 
         # ===== processa a linha i desta página =====
@@ -384,69 +463,159 @@ try:
             continue
 
         print(f"\nCategoria: {codigo} - {descricao}")
+        lhash = listing_hash(codigo, descricao)
+        if codigo:
+            seen_codes.add(codigo)
 
+        if REFRESH_MODE:
+            # só rebusca se a entrada da listagem mudou ou os dados venceram o TTL
+            if codigo and not needs_refresh(hash_store, codigo, lhash, REFRESH_TTL_HORAS * 3600):
+                print("   (sem alterações; pulando)")
+                i += 1
+                save_progress(pagina, i)
+                continue
         # evita duplicado (já processados e com código não vazio)
-        if codigo and codigo in processed_codes:
+        elif codigo and codigo in processed_codes:
             print("   (já processada; pulando)")
             i += 1
             save_progress(pagina, i)
             continue
 
         # botão do olho
-        candid = linha.find_elements(By.CSS_SELECTOR, "td:nth-child(3) button")
-        if not candid:
-            candid = linha.find_elements(By.XPATH, ".//td[3]//button | .//td[3]//a")
-        if not candid:
+        botao = eye_button(linha)
+        if botao is None:
             i += 1
             save_progress(pagina, i)
             continue
-        botao = candid[0]
 
-        # abre detalhe (espera pelo botão Voltar)
-        ok = click_and_wait(botao, (By.ID, "btnVoltarTbListCategorias"), max_tries=3)
-        if not ok:
-            driver.execute_script("arguments[0].click();", botao)
-            WebDriverWait(driver, WAIT_LONG).until(EC.presence_of_element_located((By.ID, "btnVoltarTbListCategorias")))
-
-        # coleta linhas de CIDs (se houver)
-        tabela = driver.find_elements(By.ID, "tabela_body")
-        if not tabela:
-            tabela = driver.find_elements(By.CSS_SELECTOR, "[id*='tabela_body']")
-
-        detalhas = []
-        if tabela:
-            for _ in range(int(8 / POLL_SLEEP)):  # ~8s
-                detalhas = driver.find_elements(By.CSS_SELECTOR, "[id*='tabela_body'] > tr")
-                if detalhas:
-                    break
-                time.sleep(POLL_SLEEP)
-
-        out_rows = []
-        if detalhas:
-            for row in detalhas:
-                cols = row.find_elements(By.TAG_NAME, "td")
-                if len(cols) >= 2:
-                    cid_codigo = (cols[0].text or "").strip()
-                    cid_desc   = (cols[1].text or "").strip()
-                    out_rows.append([codigo, descricao, cid_codigo, cid_desc])
-        else:
-            # registre categorias sem detalhe, se quiser manter
-            out_rows.append([codigo, descricao, "", ""])
-
-        # salva Excel incremental
-        append_rows_xlsx(out_rows)
+        # abre detalhe (ou reaproveita do cache em disco)
+        out_rows = cached_fetch(
+            detail_cache, codigo, detail_fingerprint(lhash),
+            lambda validadores: (open_and_collect_details(botao, codigo, descricao), {}),
+        )
+
+        # salva Excel incremental com upsert por (categoria_codigo, cid_codigo):
+        # linhas repetidas são descartadas, alteradas viram a versão vigente
+        mudou = record_category(hash_store, codigo, lhash, out_rows, delta) if codigo else True
+        if REFRESH_MODE and codigo in processed_codes and mudou:
+            print("   (conteúdo alterado; atualizando)")
+        row_writer.upsert_category(codigo, out_rows)
         if codigo:
             processed_codes.add(codigo)
-
-        # volta pra lista
-        click_voltar()
-        switch_into_categorias(driver, wait)
+            save_hash_store(hash_store)
 
         # avança pro próximo item da MESMA página
         i += 1
         save_progress(pagina, i)
 
-        time.sleep(0.3)
+    if REFRESH_MODE:
+        # categorias que sumiram da listagem só podem ser detectadas com a varredura completa
+        if listagem_completa:
+            for codigo in drop_missing_categories(hash_store, seen_codes, delta):
+                row_writer.drop_category(codigo)
+            save_hash_store(hash_store)
+        save_delta(delta)
+        print(f"\nDelta: +{len(delta['adicionados'])} -{len(delta['removidos'])} ~{len(delta['alterados'])} CIDs")
+
+    # versões substituídas/removidas ficam no Excel até a compactação (streaming)
+    print(row_writer.report())
+    if row_writer.superseded_rows():
+        mantidas, descartadas = row_writer.compact()
+        print(f"Excel compactado: {mantidas} linhas mantidas, {descartadas} descartadas")
+    row_writer.close()
+
+# ---------- Modo fila (vários workers) ----------
+def seed_queue(queue):
+    """Percorre a listagem inteira e enfileira cada categoria com sua (página, índice)."""
+    pagina = open_listing()
+    while True:
+        switch_into_categorias(driver, wait)
+        itens = []
+        for idx, linha in enumerate(driver.find_elements(By.CSS_SELECTOR, "#tbCategorias > tbody > tr")):
+            tds = linha.find_elements(By.TAG_NAME, "td")
+            if len(tds) < 3:
+                continue
+            codigo = (tds[0].text or "").strip()
+            if codigo:
+                itens.append((codigo, (tds[1].text or "").strip(), pagina, idx))
+        queue.enqueue(itens)
+        print(f"   página {pagina}: {len(itens)} categorias enfileiradas")
+        if not queue.renew_seeding(WORKER_ID):
+            print("   (reserva de semeadura perdida; outro worker continua)")
+            return
+        if not go_next_page():
+            break
+        pagina += 1
+        wait_listing_ready()
+    queue.mark_seeded()
+
+def find_listing_row(codigo, indice):
+    """Linha da página atual com o código dado (tenta primeiro o índice enfileirado)."""
+    switch_into_categorias(driver, wait)
+    linhas = driver.find_elements(By.CSS_SELECTOR, "#tbCategorias > tbody > tr")
+    ordem = list(range(len(linhas)))
+    if indice < len(linhas):
+        ordem.remove(indice)
+        ordem.insert(0, indice)
+    for k in ordem:
+        tds = linhas[k].find_elements(By.TAG_NAME, "td")
+        if len(tds) >= 3 and (tds[0].text or "").strip() == codigo:
+            return linhas[k]
+    return None
+
+def run_worker(queue):
+    """
+    Modo fila: pega categorias com lease até a fila esvaziar. Os resultados vão para a
+    fila (não para o Excel); `python fila.py exportar` junta tudo no cids.xlsx depois.
+    Só um worker semeia a fila; os outros já vão pegando o que foi enfileirado. Sem item
+    disponível, o worker continua consultando enquanto a semeadura não terminou ou outros
+    workers têm itens em andamento (se um deles morrer, o lease vence e alguém assume).
+    """
+    pagina = None
+    while True:
+        if not queue.is_seeded() and queue.claim_seeding(WORKER_ID):
+            print("Fila ainda não semeada: enfileirando categorias da listagem...")
+            seed_queue(queue)
+            pagina = None
+        itens = queue.lease(WORKER_ID)
+        if not itens:
+            if queue.is_seeded() and not queue.stats().get("em_andamento"):
+                break
+            time.sleep(QUEUE_POLL_SLEEP)
+            continue
+        if pagina is None:
+            pagina = open_listing()
+        item = itens[0]
+        print(f"\nCategoria: {item.codigo} - {item.descricao} (página {item.pagina})")
+        try:
+            with queue.keep_alive(item) as hb:
+                pagina = advance_to_page(pagina, item.pagina)
+                linha = find_listing_row(item.codigo, item.indice)
+                botao = eye_button(linha) if linha is not None else None
+                if botao is None:
+                    raise LookupError(f"categoria {item.codigo} não encontrada na página {pagina}")
+                out_rows = cached_fetch(
+                    detail_cache, item.codigo, detail_fingerprint(listing_hash(item.codigo, item.descricao)),
+                    lambda validadores: (open_and_collect_details(botao, item.codigo, item.descricao), {}),
+                )
+            if hb.perdido or not queue.complete(item, out_rows):
+                print("   (lease perdido; outro worker assume a categoria)")
+        except Exception as e:
+            print(f"   erro: {e!r}; devolvendo à fila")
+            queue.release(item, repr(e))
+            pagina = open_listing()  # estado do navegador incerto: recomeça da página 1
+
+    print(f"\nFila: {queue.stats()}")
+
+# ========= INÍCIO =========
+try:
+    if QUEUE_PATH:
+        run_worker(SqliteWorkQueue(QUEUE_PATH))
+    else:
+        run_sequential()
 
 finally:
+    print(detail_cache.report())
+    print(f"Rate limiter: taxa final {limiter.rate():.2f} req/s, {limiter.esperado:.1f}s esperando tokens")
+    detail_cache.close()
     driver.quit()
@@ -0,0 +1,112 @@
+"""
+Limitador de taxa (token bucket) compartilhado por todas as navegações do scraper.
+
+Sem `path`, o balde vive em memória e é compartilhado entre as threads do processo.
+Com `path`, o estado fica numa tabela SQLite e é compartilhado entre processos e máquinas
+(o mesmo arquivo da fila serve). A taxa se ajusta sozinha (AIMD): sobe um pouco a cada
+sucesso até `taxa_max` e cai pela metade, com uma pausa para todos, em erro/429/503.
+"""
+import sqlite3, threading, time
+
+TAXA = 2.0            # requisições por segundo, no início
+RAJADA = 4            # tokens acumuláveis (burst)
+TAXA_MIN = 0.2
+TAXA_MAX = 6.0
+PASSO = 0.05          # aumento aditivo por sucesso
+FATOR_QUEDA = 0.5     # redução multiplicativa por erro
+PAUSA_ERRO = 2.0      # segundos de pausa global num erro comum
+PAUSA_THROTTLE = 30.0 # segundos de pausa global em 429/503
+
+class TokenBucket:
+    def __init__(self, taxa=TAXA, rajada=RAJADA, path=None,
+                 taxa_min=TAXA_MIN, taxa_max=TAXA_MAX, passo=PASSO):
+        self.rajada = rajada
+        self.taxa_min = taxa_min
+        self.taxa_max = taxa_max
+        self.passo = passo
+        self.path = path
+        self.esperado = 0.0   # segundos esperando por tokens (só este processo)
+        self._lock = threading.Lock()
+        inicial = {"tokens": float(rajada), "atualizado_em": time.time(), "taxa": float(taxa), "pausa_ate": 0.0}
+        if path is None:
+            self._estado = inicial
+        else:
+            db = self._connect()
+            try:
+                db.execute("""
+                    CREATE TABLE IF NOT EXISTS balde (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        tokens REAL NOT NULL, atualizado_em REAL NOT NULL,
+                        taxa REAL NOT NULL, pausa_ate REAL NOT NULL
+                    )""")
+                db.execute("INSERT OR IGNORE INTO balde (id, tokens, atualizado_em, taxa, pausa_ate) "
+                           "VALUES (1, :tokens, :atualizado_em, :taxa, :pausa_ate)", inicial)
+            finally:
+                db.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def _update(self, fn):
+        """Aplica fn(estado, agora) -> resultado de forma atômica (lock ou transação SQLite)."""
+        with self._lock:
+            if self.path is None:
+                return fn(self._estado, time.time())
+            db = self._connect()
+            try:
+                db.execute("BEGIN IMMEDIATE")
+                tokens, atualizado_em, taxa, pausa_ate = db.execute(
+                    "SELECT tokens, atualizado_em, taxa, pausa_ate FROM balde WHERE id = 1").fetchone()
+                estado = {"tokens": tokens, "atualizado_em": atualizado_em, "taxa": taxa, "pausa_ate": pausa_ate}
+                out = fn(estado, time.time())
+                db.execute("UPDATE balde SET tokens = :tokens, atualizado_em = :atualizado_em, "
+                           "taxa = :taxa, pausa_ate = :pausa_ate WHERE id = 1", estado)
+                db.execute("COMMIT")
+                return out
+            finally:
+                db.close()
+
+    def _refill(self, e, agora):
+        decorrido = max(0.0, agora - e["atualizado_em"])
+        e["tokens"] = min(float(self.rajada), e["tokens"] + decorrido * e["taxa"])
+        e["atualizado_em"] = agora
+
+    def acquire(self):
+        """Bloqueia até haver um token (respeitando pausas globais) e o consome."""
+        while True:
+            def tentar(e, agora):
+                if agora < e["pausa_ate"]:
+                    return e["pausa_ate"] - agora
+                self._refill(e, agora)
+                if e["tokens"] >= 1.0:
+                    e["tokens"] -= 1.0
+                    return 0.0
+                return (1.0 - e["tokens"]) / e["taxa"]
+            espera = self._update(tentar)
+            if espera <= 0:
+                return
+            self.esperado += espera
+            time.sleep(espera)
+
+    def reward(self):
+        """Sucesso: aumento aditivo da taxa até taxa_max."""
+        def subir(e, agora):
+            self._refill(e, agora)
+            e["taxa"] = min(self.taxa_max, e["taxa"] + self.passo)
+        self._update(subir)
+
+    def penalize(self, status=None):
+        """
+        Erro: corta a taxa pela metade e pausa todos os consumidores. 429/503 (o site pedindo
+        para desacelerar) pausam por mais tempo que um timeout comum.
+        """
+        pausa = PAUSA_THROTTLE if status in (429, 503) else PAUSA_ERRO
+        def cair(e, agora):
+            self._refill(e, agora)
+            e["taxa"] = max(self.taxa_min, e["taxa"] * FATOR_QUEDA)
+            e["tokens"] = 0.0
+            e["pausa_ate"] = max(e["pausa_ate"], agora + pausa)
+        self._update(cair)
+
+    def rate(self):
+        return self._update(lambda e, agora: e["taxa"])
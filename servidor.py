@@ -0,0 +1,154 @@
+"""
+Serviço HTTP local de consulta de CIDs, em cima do índice memory-mapped (cids.idx).
+
+Endpoints (respostas JSON):
+    GET  /cid/<codigo>                     -> entrada ou 404
+    GET  /prefixo/<prefixo>?limite=N       -> entradas cujo código começa com o prefixo
+    GET  /busca?q=<texto>&limite=N         -> busca textual sem acentos
+    GET  /lote?codigos=A00.0,K35.8         -> vários códigos numa requisição
+    POST /lote  {"codigos": [...]}         -> idem, no corpo
+    GET  /saude
+
+Usa HTTP/1.1 (keep-alive) e um cache LRU de respostas em memória.
+
+Uso:
+    python servidor.py [--host 127.0.0.1] [--porta 8000] [--cache 4096]
+"""
+import argparse, json, os
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import indice
+
+HOST = "127.0.0.1"
+PORT = 8000
+CACHE_SIZE = 4096        # respostas mantidas no LRU
+MAX_LIMITE = 1000        # teto para ?limite=
+MAX_LOTE = 1000          # códigos por requisição de lote
+
+def _json(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def make_app(idx, cache_size=CACHE_SIZE):
+    """
+    Devolve `responder(metodo, caminho, query, corpo) -> (status, corpo)` com as respostas dos GETs
+    memoizadas num LRU. O lote é resolvido código a código pelo mesmo LRU do lookup.
+    """
+
+    @lru_cache(maxsize=cache_size)
+    def lookup(codigo):
+        hit = idx.lookup(codigo)
+        return (200, _json(hit)) if hit else (404, _json({"erro": "código não encontrado", "codigo": codigo}))
+
+    @lru_cache(maxsize=cache_size)
+    def prefixo(p, limite):
+        return 200, _json({"prefixo": p, "resultados": idx.prefix(p, limite=limite)})
+
+    @lru_cache(maxsize=cache_size)
+    def busca(q, limite):
+        return 200, _json({"q": q, "resultados": idx.search(q, limite=limite)})
+
+    def lote(codigos):
+        if len(codigos) > MAX_LOTE:
+            return 400, _json({"erro": f"no máximo {MAX_LOTE} códigos por lote"})
+        resultados = {}
+        for c in codigos:
+            status, corpo = lookup(c)
+            resultados[c] = json.loads(corpo) if status == 200 else None
+        return 200, _json({"resultados": resultados})
+
+    def limite_de(query, padrao):
+        try:
+            return max(1, min(int(query.get("limite", [padrao])[0]), MAX_LIMITE))
+        except ValueError:
+            return padrao
+
+    def responder(metodo, caminho, query, corpo=None):
+        partes = [unquote(p) for p in caminho.strip("/").split("/") if p]
+        if metodo == "POST":
+            if partes == ["lote"]:
+                try:
+                    dados = json.loads(corpo or b"{}")
+                except ValueError:
+                    return 400, _json({"erro": "corpo JSON inválido"})
+                codigos = dados.get("codigos", []) if isinstance(dados, dict) else None
+                if not isinstance(codigos, list):
+                    return 400, _json({"erro": "codigos deve ser uma lista"})
+                return lote([str(c) for c in codigos])
+            return 404, _json({"erro": "rota não encontrada"})
+
+        if partes == ["saude"]:
+            return 200, _json({"ok": True, "cache": lookup.cache_info()._asdict()})
+        if len(partes) == 2 and partes[0] == "cid":
+            return lookup(partes[1])
+        if len(partes) == 2 and partes[0] == "prefixo":
+            return prefixo(partes[1], limite_de(query, 100))
+        if partes == ["busca"]:
+            q = query.get("q", [""])[0]
+            if not q.strip():
+                return 400, _json({"erro": "parâmetro q obrigatório"})
+            return busca(q, limite_de(query, 20))
+        if partes == ["lote"]:
+            codigos = [c for c in query.get("codigos", [""])[0].split(",") if c]
+            return lote(codigos)
+        return 404, _json({"erro": "rota não encontrada"})
+
+    return responder
+
+class CidHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    disable_nagle_algorithm = True  # cabeçalho e corpo saem em writes separados; sem isso, +40 ms de delayed ACK
+    responder = None                # preenchido em serve()
+
+    def _send(self, status, corpo):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        self._send(*self.responder("GET", url.path, parse_qs(url.query)))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            n = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            n = -1
+        if n < 0:
+            self.close_connection = True  # sem tamanho válido não dá para achar o fim do corpo
+            self._send(400, _json({"erro": "Content-Length inválido"}))
+            return
+        corpo = self.rfile.read(n) if n else b""
+        self._send(*self.responder("POST", url.path, parse_qs(url.query), corpo))
+
+    def log_message(self, format, *args):
+        pass  # sem log por requisição (atrapalha a latência sob carga)
+
+def serve(host=HOST, port=PORT, cache_size=CACHE_SIZE, index_path=indice.INDEX_PATH):
+    if not os.path.exists(index_path):
+        print(f"{index_path} não existe; gerando a partir do Excel...")
+        indice.build_index(index_path)
+    idx = indice.CidIndex(index_path)
+    CidHandler.responder = staticmethod(make_app(idx, cache_size))
+    httpd = ThreadingHTTPServer((host, port), CidHandler)
+    httpd.daemon_threads = True
+    print(f"Servindo CIDs em http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        idx.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serviço HTTP local de consulta de CIDs.")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--porta", type=int, default=PORT)
+    ap.add_argument("--cache", type=int, default=CACHE_SIZE, help="tamanho do LRU de respostas")
+    args = ap.parse_args()
+    serve(args.host, args.porta, args.cache)
@@ -0,0 +1,111 @@
+import os, json
+from openpyxl import Workbook, load_workbook
+
+# ===== Arquivos de saída/checkpoint =====
+EXCEL_PATH = "cids.xlsx"
+EXCEL_SHEET = "dados"
+PROGRESS_PATH = "progress.json"
+
+HEADER = ["categoria_codigo", "categoria_descricao", "cid_codigo", "cid_descricao"]
+
+def _cell_str(value):
+    """Normaliza o valor de uma célula para string sem espaços nas pontas."""
+    if value is None:
+        return ""
+    return value.strip() if isinstance(value, str) else str(value)
+
+# ---------- Utilitários Excel (openpyxl) ----------
+def ensure_workbook():
+    """
+    Garante que o arquivo EXCEL_PATH exista com a planilha e cabeçalho.
+    """
+    if not os.path.exists(EXCEL_PATH):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = EXCEL_SHEET
+        ws.append(HEADER)
+        wb.save(EXCEL_PATH)
+    else:
+        wb = load_workbook(EXCEL_PATH)
+        if EXCEL_SHEET not in wb.sheetnames:
+            ws = wb.create_sheet(EXCEL_SHEET)
+            ws.append(HEADER)
+            wb.save(EXCEL_PATH)
+
+def iter_numbered_rows_xlsx():
+    """
+    Percorre as linhas de dados do Excel em modo streaming (read_only), sem o cabeçalho.
+    Sem o arquivo (ou sem a planilha), não devolve nada.
+    Cada item é (número da linha na planilha, [categoria_codigo, categoria_descricao,
+    cid_codigo, cid_descricao]) com os valores já normalizados para strings.
+    """
+    if not os.path.exists(EXCEL_PATH):
+        return
+    wb = load_workbook(EXCEL_PATH, read_only=True, data_only=True)
+    try:
+        if EXCEL_SHEET not in wb.sheetnames:
+            return
+        ws = wb[EXCEL_SHEET]
+        for n, row in enumerate(ws.iter_rows(values_only=True), start=1):
+            if n == 1 or not row:
+                continue  # pula cabeçalho
+            vals = [_cell_str(v) for v in row[:4]]
+            vals += [""] * (4 - len(vals))
+            yield n, vals
+    finally:
+        wb.close()
+
+def iter_rows_xlsx():
+    """Como iter_numbered_rows_xlsx, só com as listas de valores."""
+    for _, vals in iter_numbered_rows_xlsx():
+        yield vals
+
+def xlsx_max_row():
+    """
+    Número da última linha da planilha (1 = só o cabeçalho; 0 se o Excel não existe).
+    Usa a dimensão gravada no arquivo; se não houver (arquivos write_only), conta as linhas.
+    """
+    if not os.path.exists(EXCEL_PATH):
+        return 0
+    wb = load_workbook(EXCEL_PATH, read_only=True)
+    try:
+        if EXCEL_SHEET not in wb.sheetnames:
+            return 0
+        ws = wb[EXCEL_SHEET]
+        n = ws.max_row
+        if n is None:
+            n = sum(1 for _ in ws.iter_rows(values_only=True))
+        return n
+    finally:
+        wb.close()
+
+def append_rows_xlsx(rows):
+    """
+    Acrescenta linhas ao Excel incrementalmente.
+    rows: lista de listas [categoria_codigo, categoria_descricao, cid_codigo, cid_descricao]
+    Devolve o número (na planilha) da primeira linha acrescentada.
+    """
+    ensure_workbook()
+    wb = load_workbook(EXCEL_PATH)
+    ws = wb[EXCEL_SHEET]
+    primeira = ws.max_row + 1
+    for r in rows:
+        ws.append(r)
+    # grava num temporário e troca: se cair no meio do save, o Excel anterior continua inteiro
+    tmp = EXCEL_PATH + ".anexo.tmp.xlsx"
+    wb.save(tmp)
+    wb.close()
+    os.replace(tmp, EXCEL_PATH)
+    return primeira
+
+# ---------- Checkpoint ----------
+def load_progress():
+    if not os.path.exists(PROGRESS_PATH):
+        return {"pagina_atual": 1, "proximo_indice_da_pagina": 0}
+    with open(PROGRESS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_progress(pagina_atual, proximo_indice_da_pagina):
+    data = {"pagina_atual": pagina_atual, "proximo_indice_da_pagina": proximo_indice_da_pagina}
+    with open(PROGRESS_PATH, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)